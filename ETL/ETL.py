@@ -7,7 +7,13 @@ import pandas as pd
 from os import listdir
 import os 
 from os.path import isfile, join
-from config import config
+import dbSession
+from psycopg2 import sql
+try:
+    from ETL.sensorMatrixFile import writeSensorFrame
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    from sensorMatrixFile import writeSensorFrame
 import time
 
 class soramameSensorData:
@@ -69,11 +75,8 @@ class soramameSensorData:
         # Connecting to PostgreSQL server
         conn = None
         try:
-            # read connection parameters
-            params = config()
-            
             print('Connecting to the PostgreSQL database...')
-            conn = psycopg2.connect(**params)
+            conn = dbSession.connect()
 
             # create a cursor
             cur = conn.cursor()
@@ -97,8 +100,10 @@ class soramameSensorData:
             # query to get pm2.5 values for each unique station ID
             # NOTE : Change attribute names(time,pm25) according to your table attributes
             for station in self.stationIDs:
-                query = 'select time,' +self.param+' from '+tableName +' where sname=\''+str(station[0]) + '\' ORDER BY time asc'
-                cur.execute(query)
+                # prepared once per connection, executed for every station
+                dbSession.executePrepared(cur, 'station_' + tableName + '_' + self.param,
+                                          sql.SQL('SELECT time, {} FROM {} WHERE sname = $1 ORDER BY time ASC').format(
+                                              sql.Identifier(self.param), sql.Identifier(tableName)), [station[0]])
                 self.pm25Data = cur.fetchall()  
                 
                 self.temp = {}
@@ -112,8 +117,8 @@ class soramameSensorData:
                 self.dataframe = pd.merge(self.dataframe, self.sensorDf, on = 'TimeStamp', how= 'left')
                 # self.dataframe[str(station[0])] = self.dataframe['TimeStamp'].map(self.temp)
           
-            self.dataframe.fillna('NaN', inplace = True)
-            self.dataframe.to_csv(tempPath)
+            # CSV or binary (.npy, .parquet, .feather) output depending on the file extension
+            writeSensorFrame(tempPath, self.dataframe)
             print("Created hourly sensor data")
             self.time.append(time.time())
             print('-------time taken for execution-------')
@@ -124,8 +129,8 @@ class soramameSensorData:
             print(error)
         finally:
             if conn is not None:
-                conn.close()
-                print('Database connection closed.')
+                dbSession.release(conn)
+                print('Database connection released.')
                 
         
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+
+import dbSession
+try:
+    from ETL import ETL, ETL_dict, ETL_mergeFiles, ETL_pivot
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    import ETL, ETL_dict, ETL_mergeFiles, ETL_pivot
+
+# columns of the soramame data table after sname and time
+sensorColumns = ETL_pivot.parameterNames[2:]
+
+# (stations, hours) of the synthetic tables, from a small sample to one year of a full prefecture
+defaultSizes = [(20, 24 * 7), (100, 24 * 30), (400, 24 * 90)]
+
+
+def generateSoramameRows(stations, hours, missingRate=0.1, startTime='2018-01-01 01:00:00', seed=0):
+    """
+    Generates synthetic soramame data as CSV text blocks (one block per station) in the column order of the data table.
+
+    stations    : number of stations
+    hours       : number of hourly timestamps per station
+    missingRate : fraction of sensor values replaced by the missing value sentinels (9999 and -1000)
+    startTime   : first timestamp
+    seed        : seed of the random generator
+    """
+    generator = np.random.default_rng(seed)
+    timeStamps = pd.date_range(startTime, periods=hours, freq='h').strftime('%Y-%m-%d %H:%M:%S')
+    for station in range(stations):
+        sname = 1101010 + station * 10
+        values = np.round(generator.gamma(2.0, 8.0, size=(hours, len(sensorColumns))), 1)
+        missing = generator.random(size=values.shape) < missingRate
+        values[missing] = np.where(generator.random(size=missing.sum()) < 0.5, 9999, -1000)
+        # wind direction is stored as -1 by the ingestion
+        values[:, sensorColumns.index('wd')] = -1
+        block = pd.DataFrame(values, columns=sensorColumns)
+        block.insert(0, 'time', timeStamps)
+        block.insert(0, 'sname', sname)
+        yield block.to_csv(header=False, index=False)
+
+
+def loadSyntheticTable(conn, tableName, stations, hours, missingRate=0.1):
+    """
+    Creates (or replaces) a table with the soramame schema and loads synthetic data into it with COPY.
+    """
+    cur = conn.cursor()
+    cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(sql.Identifier(tableName)))
+    cur.execute(sql.SQL('CREATE TABLE {} (sname integer NOT NULL, time timestamp NOT NULL, {})').format(
+        sql.Identifier(tableName),
+        sql.SQL(', ').join(sql.SQL('{} double precision').format(sql.Identifier(column)) for column in sensorColumns)))
+    copy = sql.SQL('COPY {} FROM STDIN WITH (FORMAT csv)').format(sql.Identifier(tableName)).as_string(conn)
+    for block in generateSoramameRows(stations, hours, missingRate):
+        cur.copy_expert(copy, io.StringIO(block))
+    cur.execute(sql.SQL('CREATE INDEX ON {} (sname, time)').format(sql.Identifier(tableName)))
+    cur.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(tableName)))
+    conn.commit()
+    cur.close()
+
+
+def runMerge(tableName, outputFile, tempDir):
+    ETL.soramameSensorData().getSensorData(outputFile, tableName, 13)
+
+
+def runDict(tableName, outputFile, tempDir):
+    ETL_dict.soramameSensorData().getSensorData(outputFile, tableName, 13)
+
+
+def runMergeFiles(tableName, outputFile, tempDir):
+    dataExtraction = ETL_mergeFiles.soramameSensorData()
+    dataExtraction.getSensorData(tempDir + os.sep, tableName, 13)
+    dataExtraction.mergeStationFiles(tempDir + os.sep, outputFile)
+
+
+def runMergeFilesParallel(tableName, outputFile, tempDir):
+    dataExtraction = ETL_mergeFiles.soramameSensorData()
+    dataExtraction.getSensorDataParallel(tempDir + os.sep, tableName, 13, workers=4)
+    dataExtraction.mergeStationFilesParallel(tempDir + os.sep, outputFile)
+
+
+def runPivotCursor(tableName, outputFile, tempDir):
+    ETL_pivot.soramameSensorData(backend='cursor').getSensorData(outputFile, tableName, 13)
+
+
+def runPivotCopy(tableName, outputFile, tempDir):
+    ETL_pivot.soramameSensorData(backend='copy').getSensorData(outputFile, tableName, 13)
+
+
+def runPartitioned(tableName, outputFile, tempDir):
+    ETL_pivot.soramameSensorData().getSensorDataPartitioned(outputFile, tempDir, tableName, 13)
+
+
+# extraction strategies, every strategy writes the pm25 matrix of tableName to outputFile
+strategies = {
+    'merge': runMerge,
+    'dict': runDict,
+    'mergeFiles': runMergeFiles,
+    'mergeFilesParallel': runMergeFilesParallel,
+    'pivotCursor': runPivotCursor,
+    'pivotCopy': runPivotCopy,
+    'partitioned': runPartitioned,
+}
+
+
+def useDatabaseSection(section):
+    """
+    Points the connections of all extraction strategies to another section of database.ini,
+    e.g. a local PostgreSQL used as stand-in for the production server.
+    """
+    dbSession.useSection(section)
+
+
+def measure(strategy, tableName, section, verbose, results):
+    """
+    Runs one strategy in a child process and reports its wall time and peak RSS.
+    A result is always reported, with succeeded = False and the error if the strategy raised.
+    """
+    start = time.time()
+    result = {'succeeded': False}
+    tempDir = tempfile.mkdtemp(prefix='soramameBenchmark')
+    try:
+        useDatabaseSection(section)
+        outputFile = os.path.join(tempDir, 'output.csv')
+        os.makedirs(os.path.join(tempDir, 'temp'))
+        start = time.time()
+        with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+            strategies[strategy](tableName, outputFile, os.path.join(tempDir, 'temp'))
+        result['succeeded'] = os.path.isfile(outputFile)
+    except Exception as error:
+        result['error'] = type(error).__name__ + ': ' + str(error)
+    finally:
+        result.update({'wallTime': time.time() - start,
+                       # ru_maxrss is reported in kilobytes on Linux
+                       'peakRssMB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                       'querySeconds': sum(entry['seconds'] for entry in dbSession.getMetrics()),
+                       'queries': sum(entry['calls'] for entry in dbSession.getMetrics())})
+        results.put(result)
+        shutil.rmtree(tempDir, ignore_errors=True)
+
+
+def waitResult(process, results, poll=1.0):
+    """
+    Waits for the result of a measure process. A process that exits without a result (killed, out of memory)
+    gives a failed result with its exit code instead of blocking the benchmark.
+    """
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            if not process.is_alive():
+                # the result may have been put just before the process exited
+                try:
+                    return results.get(timeout=poll)
+                except queue.Empty:
+                    return {'succeeded': False, 'error': 'exit code ' + str(process.exitcode), 'wallTime': None}
+
+
+def runBenchmark(resultFile, sizes=None, selected=None, missingRate=0.1, section='postgresql', repeat=1,
+                 verbose=False):
+    """
+    Loads synthetic tables of growing size and runs every extraction strategy on each of them.
+    One JSON line per run (strategy, stations, hours, rows, wallTime, peakRssMB, querySeconds, rowsPerSec)
+    is appended to resultFile.
+
+    resultFile  : JSON lines file receiving the results
+    sizes       : list of (stations, hours) of the synthetic tables
+    selected    : names of the strategies to run (default = all strategies)
+    missingRate : fraction of missing sensor values
+    section     : section of database.ini of the benchmark database
+    repeat      : number of runs per strategy and size
+    verbose     : show the output of the strategies
+    """
+    sizes = sizes or defaultSizes
+    selected = selected or list(strategies)
+    context = multiprocessing.get_context('spawn')
+    for stations, hours in sizes:
+        tableName = 'benchmark_' + str(stations) + '_' + str(hours)
+        conn = dbSession.connect(section)
+        try:
+            start = time.time()
+            loadSyntheticTable(conn, tableName, stations, hours, missingRate)
+            print('Loaded', tableName, 'in', time.time() - start, ' sec')
+        finally:
+            dbSession.release(conn, section)
+
+        for strategy in selected:
+            for run in range(repeat):
+                # a fresh process per run, so that the peak RSS belongs to a single strategy
+                results = context.Queue()
+                process = context.Process(target=measure, args=(strategy, tableName, section, verbose, results))
+                process.start()
+                result = waitResult(process, results)
+                process.join()
+                result.update({'strategy': strategy, 'stations': stations, 'hours': hours, 'run': run,
+                               'missingRate': missingRate, 'rows': stations * hours,
+                               'rowsPerSec': stations * hours / result['wallTime'] if result['wallTime'] else None})
+                print(json.dumps(result))
+                with open(resultFile, 'a') as file:
+                    file.write(json.dumps(result) + '\n')
+
+        conn = dbSession.connect(section)
+        try:
+            cur = conn.cursor()
+            cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(sql.Identifier(tableName)))
+            conn.commit()
+        finally:
+            dbSession.release(conn, section)
+
+
+if __name__ == "__main__":
+    # python -m ETL.ETL_benchmark results.jsonl --sizes=20x168,100x720 --strategies=pivotCopy,merge --section=benchmark
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv if arg.startswith('--'))
+    sys.argv = [arg for arg in sys.argv if not arg.startswith('--')]
+    if len(sys.argv) == 2:
+        runBenchmark(sys.argv[1],
+                     sizes=[tuple(int(value) for value in size.split('x')) for size in options['sizes'].split(',')]
+                     if 'sizes' in options else None,
+                     selected=options['strategies'].split(',') if 'strategies' in options else None,
+                     missingRate=float(options.get('missing', 0.1)),
+                     section=options.get('section', 'postgresql'),
+                     repeat=int(options.get('repeat', 1)),
+                     verbose='verbose' in options)
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> result file, --sizes=STATIONSxHOURS,..., --strategies=name,..., "
+              "--missing=0.1, --section=postgresql, --repeat=1, --verbose")
+        print("Strategies->", ', '.join(strategies))
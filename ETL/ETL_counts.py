@@ -0,0 +1,125 @@
+import sys
+import time
+
+from psycopg2 import sql
+
+import dbSession
+try:
+    from ETL.ETL_pivot import getParameterName, missingValues, rangeCondition
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    from ETL_pivot import getParameterName, missingValues, rangeCondition
+
+# conditions accepted by DataAnalyzer and the matching SQL operators
+operators = {'>': '>', '>=': '>=', '<': '<', '<=': '<=', '==': '=', '!=': '<>'}
+
+# time buckets accepted by date_trunc
+buckets = ['hour', 'day', 'week', 'month', 'quarter', 'year']
+
+
+class soramameThresholdCounts:
+    """
+    Counts, for every station, the hours in which a sensor parameter satisfies a condition directly in the
+    database with COUNT(*) FILTER (WHERE ...), so that only one row per station (and time bucket) is transferred.
+
+    The counts are the ones DataAnalyzer.analyze_data computes on the extracted matrix: missing values (-1000/9999)
+    and hours without a row are NaN there, so they never satisfy the condition except for '!=', which counts them.
+    """
+
+    def __init__(self):
+        self.hashmap = None
+        self.time = []
+
+    def getCounts(self, condition, threshold, outputParam=13, tableName='data', startTime=None, endTime=None,
+                  bucket=None):
+        """
+        Returns the hashmap with Key = stationID and value = number of hours satisfying the condition
+        (the same hashmap as DataAnalyzer.analyze_data). With a bucket the value is a dictionary
+        mapping the start of every time bucket to its count.
+        Every station of the table is a key, stations without rows in the time range (or bucket) count 0
+        ('!=' counts all the hours of the range, which are missing for these stations).
+
+        condition   : comparison operator ('>', '>=', '<', '<=', '==', '!=')
+        threshold   : threshold value
+        outputParam : position of the sensor column in the data table (default = 13, pm25)
+        tableName   : table containing soramame data
+        startTime   : first timestamp to count (inclusive), whole table if None
+        endTime     : last timestamp to count (exclusive), whole table if None
+        bucket      : optional time bucket ('hour', 'day', 'week', 'month', 'quarter', 'year')
+        """
+        self.time = [time.time()]
+        if condition not in operators:
+            raise ValueError('Error : unknown condition ' + str(condition))
+        if bucket is not None and bucket not in buckets:
+            raise ValueError('Error : unknown time bucket ' + str(bucket))
+        param = sql.Identifier(getParameterName(outputParam))
+        table = sql.Identifier(tableName)
+
+        where, arguments = rangeCondition(startTime, endTime)
+        groups = [sql.SQL('sname')]
+        if bucket is not None:
+            groups.append(sql.SQL('date_trunc({}, time)').format(sql.Literal(bucket)))
+        # '!=' is counted as the hours of the range minus the hours equal to the threshold, so that missing values
+        # and hours without a row count as different like NaN values of the extracted matrix
+        operator = operators['=='] if condition == '!=' else operators[condition]
+        query = sql.SQL('SELECT {groups}, COUNT(*) FILTER (WHERE {param} {operator} %s AND {param} NOT IN ({missing})) '
+                        'FROM {table}{where} GROUP BY {groups} ORDER BY {groups}').format(
+            groups=sql.SQL(', ').join(groups), param=param, operator=sql.SQL(operator),
+            missing=sql.SQL(', ').join(sql.Literal(value) for value in missingValues),
+            table=table, where=where)
+        # hours of the range (of every bucket), the time axis of the extracted matrix
+        hoursQuery = sql.SQL('SELECT {bucket}COUNT(DISTINCT time) FROM {table}{where}{group}').format(
+            bucket=groups[1] + sql.SQL(', ') if bucket is not None else sql.SQL(''), table=table, where=where,
+            group=sql.SQL(' GROUP BY 1 ORDER BY 1') if bucket is not None else sql.SQL(''))
+
+        conn = None
+        try:
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            cur = conn.cursor()
+            cur.execute(query, [threshold] + arguments)
+            rows = cur.fetchall()
+            cur.execute(sql.SQL('SELECT DISTINCT sname FROM {} ORDER BY sname').format(table))
+            stations = [row[0] for row in cur.fetchall()]
+            cur.execute(hoursQuery, arguments)
+            hours = cur.fetchall()
+            cur.close()
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+        # keys are strings like the station columns of the extracted CSV file
+        self.hashmap = {}
+        if bucket is None:
+            rangeHours = hours[0][0]
+            for station in stations:
+                self.hashmap[str(station)] = rangeHours if condition == '!=' else 0
+            for station, count in rows:
+                self.hashmap[str(station)] = rangeHours - count if condition == '!=' else count
+        else:
+            bucketHours = dict(hours)
+            for station in stations:
+                self.hashmap[str(station)] = {start: count if condition == '!=' else 0
+                                              for start, count in bucketHours.items()}
+            for station, start, count in rows:
+                self.hashmap[str(station)][start] = bucketHours[start] - count if condition == '!=' else count
+        self.time.append(time.time())
+        print('Counted', len(rows), 'groups in', self.time[1] - self.time[0], ' sec')
+        return self.hashmap
+
+
+if __name__ == "__main__":
+    if 3 <= len(sys.argv) <= 8:
+        thresholdCounts = soramameThresholdCounts()
+        hashmap = thresholdCounts.getCounts(condition=sys.argv[1], threshold=float(sys.argv[2]),
+                                            outputParam=int(sys.argv[3]) if len(sys.argv) > 3 else 13,
+                                            tableName=sys.argv[4] if len(sys.argv) > 4 else 'data',
+                                            startTime=sys.argv[5] if len(sys.argv) > 5 else None,
+                                            endTime=sys.argv[6] if len(sys.argv) > 6 else None,
+                                            bucket=sys.argv[7] if len(sys.argv) > 7 else None)
+        print(hashmap)
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> condition, threshold, outputParam (default = pm25), tablename (default = data), "
+              "start time, end time, time bucket (hour, day, week, month, quarter, year)")
@@ -6,7 +6,18 @@ import pandas as pd
 from os import listdir
 import os 
 from os.path import isfile, join
-from config import config
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import numpy as np
+import dbSession
+from psycopg2 import sql
+try:
+    from ETL.ETL_pivot import getParameterName, missingValues
+    from ETL.sensorMatrixFile import writeSensorFrame, writeSensorMatrix
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    from ETL_pivot import getParameterName, missingValues
+    from sensorMatrixFile import writeSensorFrame, writeSensorMatrix
 import time
 
 class soramameSensorData:
@@ -68,11 +79,8 @@ class soramameSensorData:
         # Connecting to PostgreSQL server
         conn = None
         try:
-            # read connection parameters
-            params = config()
-            
             print('Connecting to the PostgreSQL database...')
-            conn = psycopg2.connect(**params)
+            conn = dbSession.connect()
 
             # create a cursor
             cur = conn.cursor()
@@ -92,9 +100,10 @@ class soramameSensorData:
             # query to get pm2.5 values for each unique station ID
             # NOTE : Change attribute names(time,pm25) according to your table attributes
             for station in self.stationIDs:
-                query = 'select time,' +self.param+' from '+tableName +' where sname=\''+str(station[0]) + '\' ORDER BY time asc'
-                # print(query)
-                cur.execute(query)
+                # prepared once per connection, executed for every station
+                dbSession.executePrepared(cur, 'station_' + tableName + '_' + self.param,
+                                          sql.SQL('SELECT time, {} FROM {} WHERE sname = $1 ORDER BY time ASC').format(
+                                              sql.Identifier(self.param), sql.Identifier(tableName)), [station[0]])
                 self.pm25Data = cur.fetchall()  
                 
                 self.temp = {}
@@ -112,8 +121,8 @@ class soramameSensorData:
             print(error)
         finally:
             if conn is not None:
-                conn.close()
-                print('Database connection closed.')
+                dbSession.release(conn)
+                print('Database connection released.')
         
     def mergeStationFiles(self,tempPath,outputFile):
         '''
@@ -128,8 +137,8 @@ class soramameSensorData:
                 
                 self.dataframe = pd.merge(self.dataframe, stationDf, on = 'TimeStamp', how= 'left')
                 os.remove(filePath)
-        self.dataframe.fillna('NaN', inplace = True)
-        self.dataframe.to_csv(outputFile)
+        # CSV or binary (.npy, .parquet, .feather) output depending on the file extension
+        writeSensorFrame(outputFile, self.dataframe)
         print("Created soramame data file")
         self.time.append(time.time())
         print('-------time taken for execution-------')
@@ -138,8 +147,123 @@ class soramameSensorData:
         print('Total time :',self.time[3] - self.time[0],' sec')
         # print('query execution :',self.time[1] - self.time[2],' sec')
         
+    def getStationSlice(self, pool, slots, tempPath, tableName, station):
+        """
+            Reads the values of one station through a pooled connection and stores them as a binary (.npz) file.
+            The worker waits for one of the slots before borrowing a connection.
+        """
+        with slots:
+            conn = pool.getconn()
+            try:
+                cur = conn.cursor()
+                dbSession.executePrepared(cur, 'station_' + tableName + '_' + self.param,
+                                          sql.SQL('SELECT time, {} FROM {} WHERE sname = $1 ORDER BY time ASC').format(
+                                              sql.Identifier(self.param), sql.Identifier(tableName)), [station])
+                rows = cur.fetchall()
+                cur.close()
+            finally:
+                dbSession.release(conn)
+        timeStamps = np.array([row[0] for row in rows], dtype='datetime64[ns]')
+        values = np.array([row[1] for row in rows], dtype=np.float64)
+        values[np.isin(values, missingValues)] = np.nan
+        np.savez(tempPath + str(station) + '.npz', timeStamps=timeStamps, values=values)
+        return len(rows)
+
+    def getSensorDataParallel(self, tempPath, tableName = 'data', outputParam = 13, workers = 4, poolSize = None):
+        """
+        Fetches the stations concurrently through the shared pool of database connections and
+        stores the slice of each station as a binary (.npz) file in tempPath.
+
+        workers  : number of stations processed at the same time
+        poolSize : maximum number of connections used at the same time (default = workers), workers beyond it
+                   wait for a connection to be released
+
+        Returns True if every station was extracted.
+        """
+        self.stageTimes = {}
+        start = time.time()
+        try:
+            self.param = getParameterName(outputParam)
+            poolSize = max(poolSize or workers, 1)
+            print('Connecting to the PostgreSQL database...')
+            pool = dbSession.getPool(maxConnections=poolSize)
+            slots = threading.BoundedSemaphore(poolSize)
+
+            with slots:
+                conn = pool.getconn()
+            try:
+                cur = conn.cursor()
+                cur.execute(sql.SQL('SELECT DISTINCT time FROM {} ORDER BY time ASC').format(sql.Identifier(tableName)))
+                self.timeStamps = cur.fetchall()
+                cur.execute(sql.SQL('SELECT DISTINCT sname FROM {} ORDER BY sname ASC').format(sql.Identifier(tableName)))
+                self.stationIDs = cur.fetchall()
+                cur.close()
+            finally:
+                dbSession.release(conn)
+            self.stageTimes['index query'] = time.time() - start
+
+            start = time.time()
+            with ThreadPoolExecutor(max_workers = workers) as executor:
+                rows = sum(executor.map(lambda station: self.getStationSlice(pool, slots, tempPath, tableName, station[0]),
+                                        self.stationIDs))
+            self.stageTimes['station extraction'] = time.time() - start
+            print("Created stationID Files :", len(self.stationIDs), "stations,", rows, "rows")
+            return True
+
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error)
+            self.timeStamps = self.stationIDs = None
+            # Station files may be missing, mergeStationFilesParallel must not run on them
+            return False
+
+    def mergeStationFilesParallel(self, tempPath, outputFile):
+        """
+            Places the binary station files written by getSensorDataParallel into a preallocated time x station matrix
+            and stores it (CSV or binary output depending on the file extension)
+        """
+        if self.timeStamps is None or self.stationIDs is None:
+            print('Error : station files were not extracted')
+            return
+        start = time.time()
+        timeStamps = np.array([row[0] for row in self.timeStamps], dtype='datetime64[ns]')
+        stations = [station[0] for station in self.stationIDs]
+        matrix = np.full((len(timeStamps), len(stations)), np.nan)
+        for column, station in enumerate(stations):
+            filePath = tempPath + str(station) + '.npz'
+            with np.load(filePath) as stationSlice:
+                matrix[np.searchsorted(timeStamps, stationSlice['timeStamps']), column] = stationSlice['values']
+            os.remove(filePath)
+        self.stageTimes['matrix placement'] = time.time() - start
+
+        start = time.time()
+        writeSensorMatrix(outputFile, timeStamps, stations, matrix)
+        self.stageTimes['write output'] = time.time() - start
+        print("Created soramame data file")
+        print('-------time taken for execution-------')
+        for stage, seconds in self.stageTimes.items():
+            print(stage, ':', seconds, ' sec')
+        print('Total time :', sum(self.stageTimes.values()), ' sec')
+
 if __name__ == "__main__":
-    if len(sys.argv) == 3:
+    # optional --workers=N and --pool=N arguments select the parallel extraction
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv if arg.startswith('--'))
+    sys.argv = [arg for arg in sys.argv if not arg.startswith('--')]
+    if 'workers' in options or 'pool' in options:
+        if 3 <= len(sys.argv) <= 5:
+            workers = int(options.get('workers', 4))
+            dataExtraction = soramameSensorData()
+            extracted = dataExtraction.getSensorDataParallel(tempPath = sys.argv[1],
+                                                 tableName = sys.argv[3] if len(sys.argv) > 3 else 'data',
+                                                 outputParam = int(sys.argv[4]) if len(sys.argv) > 4 else 13,
+                                                 workers = workers, poolSize = int(options.get('pool', workers)))
+            if extracted:
+                dataExtraction.mergeStationFilesParallel(tempPath = sys.argv[1], outputFile = sys.argv[2])
+            else :
+                print("Error : extraction failed, the output file was not written")
+        else :
+            print("Error : Incorrect number of input parameters given : "+ str(len(sys.argv) - 1))
+            print("Input Parameters-> temporary file path , outputFileName, tablename (default = data), outputParam (default = pm25), --workers=N, --pool=N")
+    elif len(sys.argv) == 3:
         print(len(sys.argv),"input args")  
         dataExtraction = soramameSensorData()
         dataExtraction.getSensorData(tempPath=sys.argv[1], tableName = str('data'),  outputParam = int(13))
@@ -156,5 +280,5 @@ if __name__ == "__main__":
         dataExtraction.mergeStationFiles(tempPath = sys.argv[1],outputFile= sys.argv[2])
     else :
         print("Error : Incorrect number of input parameters given : "+ str(len(sys.argv) - 1))
-        print("Input Parameters-> temporary file path , outputFileName, tablename (default = data), outputParam (default = pm25)")
+        print("Input Parameters-> temporary file path , outputFileName, tablename (default = data), outputParam (default = pm25), --workers=N, --pool=N")
     
\ No newline at end of file
@@ -0,0 +1,563 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+import dbSession
+try:
+    from ETL.sensorMatrixFile import getFormat, loadSensorMatrix, sidecarFiles, writeSensorMatrix
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    from sensorMatrixFile import getFormat, loadSensorMatrix, sidecarFiles, writeSensorMatrix
+
+# column names of the soramame data table, outputParam is the (1 based) position in this list
+parameterNames = ['sname', 'time', 'so2', 'no', 'no2', 'nox', 'co', 'ox', 'nmhc', 'ch4', 'thc',
+                  'spm', 'pm25', 'sp', 'wd', 'ws', 'temp', 'hum']
+
+# values stored in the data table for missing sensor readings
+missingValues = [-1000, 9999]
+
+
+def getParameterName(outputParam):
+    """
+    Returns the column name of the data table for the given parameter index.
+
+    outputParam : position of the sensor column in the data table (3 = so2, ..., 13 = pm25, ..., 18 = hum)
+    """
+    if outputParam < 3 or outputParam > len(parameterNames):
+        raise ValueError('Error : parameter index ' + str(outputParam) + ' out of range')
+    return parameterNames[outputParam - 1]
+
+
+def rangeCondition(startTime=None, endTime=None, inclusiveStart=True):
+    """
+    Returns the WHERE clause and its arguments restricting time to [startTime, endTime)
+    (or (startTime, endTime) if inclusiveStart is False).
+    """
+    conditions = []
+    arguments = []
+    if startTime is not None:
+        conditions.append(sql.SQL('time >= %s' if inclusiveStart else 'time > %s'))
+        arguments.append(startTime)
+    if endTime is not None:
+        conditions.append(sql.SQL('time < %s'))
+        arguments.append(endTime)
+    if len(conditions) == 0:
+        return sql.SQL(''), arguments
+    return sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions), arguments
+
+
+class soramameSensorData:
+    """
+    Extracts the time x station matrix of a sensor parameter (or a time x station x parameter cube of
+    several parameters) with a single ordered query.
+
+    All (sname, time, value, ...) rows of the requested range are streamed from the database and scattered
+    into a preallocated float array using integer timestamp and station indexes.
+
+    chunkSize : number of rows parsed (copy) or fetched (cursor) at a time
+    backend   : 'copy' streams the rows with COPY ... TO STDOUT and parses them in chunks without creating
+                Python objects per row, 'cursor' fetches tuples through a server side cursor.
+                The cursor backend is used as fallback when COPY fails.
+    """
+
+    def __init__(self, chunkSize=100000, backend='copy'):
+        self.timeStamps = None
+        self.stationIDs = None
+        self.stationIndex = None
+        self.matrix = None
+        self.cube = None
+        self.param = 'pm25'
+        self.params = ['pm25']
+        self.chunkSize = chunkSize
+        self.backend = backend
+        self.time = []
+
+    def getIndexes(self, cur, tableName, startTime=None, endTime=None, inclusiveStart=True):
+        """
+        Reads the distinct timestamps and stationIDs of the requested range and builds the integer indexes.
+        """
+        where, arguments = rangeCondition(startTime, endTime, inclusiveStart)
+        query = sql.SQL('SELECT DISTINCT time FROM {}{} ORDER BY time ASC').format(sql.Identifier(tableName), where)
+        cur.execute(query, arguments)
+        self.timeStamps = np.array([row[0] for row in cur.fetchall()], dtype='datetime64[ns]')
+
+        query = sql.SQL('SELECT DISTINCT sname FROM {}{} ORDER BY sname ASC').format(sql.Identifier(tableName), where)
+        cur.execute(query, arguments)
+        self.stationIDs = [row[0] for row in cur.fetchall()]
+        self.stationIndex = {station: i for i, station in enumerate(self.stationIDs)}
+
+    def locate(self, times):
+        """
+        Returns the rows of the cube of the given timestamps, raising ValueError if one of them is not in the index.
+        """
+        positions = np.searchsorted(self.timeStamps, times)
+        found = positions < len(self.timeStamps)
+        found[found] = self.timeStamps[positions[found]] == times[found]
+        if not found.all():
+            raise ValueError('Error : timestamp ' + str(times[~found][0]) + ' is not in the extracted index')
+        return positions
+
+    def scatter(self, rows):
+        """
+        Places a chunk of (sname, time, value, ...) rows into the cube, turning missing value sentinels into NaN.
+        """
+        rows = list(zip(*rows))
+        unknown = [station for station in rows[0] if station not in self.stationIndex]
+        if len(unknown) > 0:
+            raise ValueError('Error : station ' + str(unknown[0]) + ' is not in the extracted index')
+        columns = np.fromiter((self.stationIndex[station] for station in rows[0]), dtype=np.intp, count=len(rows[0]))
+        positions = self.locate(np.array(rows[1], dtype='datetime64[ns]'))
+        self.place(positions, columns, np.array(rows[2:], dtype=np.float64).T)
+
+    def place(self, positions, columns, values):
+        """
+        Writes a (rows x parameters) block of values at the given time positions and station columns of the cube.
+        """
+        values[np.isin(values, missingValues)] = np.nan
+        self.cube[positions, columns, :] = values
+
+    def extract(self, conn, tableName, params, startTime=None, endTime=None, inclusiveStart=True):
+        """
+        Streams the given parameter columns of every station in one ordered query into a time x station x parameter cube.
+        The extraction runs in its own transaction, conn must not be inside a transaction.
+        """
+        self.params = params
+        if self.backend == 'copy':
+            try:
+                self.readSnapshot(conn, self.streamCopy, tableName, params, startTime, endTime, inclusiveStart)
+                return
+            except psycopg2.Error as error:
+                print(error)
+                print('COPY failed, falling back to the cursor backend')
+                conn.rollback()
+        self.readSnapshot(conn, self.streamCursor, tableName, params, startTime, endTime, inclusiveStart)
+
+    def readSnapshot(self, conn, stream, tableName, params, startTime=None, endTime=None, inclusiveStart=True):
+        """
+        Reads the indexes and streams the rows in one REPEATABLE READ, READ ONLY transaction, so that rows
+        committed meanwhile (e.g. by a running ingestion) are neither streamed nor missing from the indexes.
+        """
+        cur = conn.cursor()
+        cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        self.getIndexes(cur, tableName, startTime, endTime, inclusiveStart)
+        cur.close()
+        self.cube = np.full((len(self.timeStamps), len(self.stationIDs), len(params)), np.nan)
+        del self.time[1:]
+        self.time.append(time.time())
+
+        stream(conn, tableName, params, startTime, endTime, inclusiveStart)
+        conn.commit()
+        self.time.append(time.time())
+
+    def streamCursor(self, conn, tableName, params, startTime=None, endTime=None, inclusiveStart=True):
+        """
+        Fetches the rows through a server side cursor in chunks of tuples.
+        """
+        # server side cursor streams the rows instead of loading the whole result on the client
+        cur = conn.cursor(name='soramameSensorStream')
+        cur.itersize = self.chunkSize
+        where, arguments = rangeCondition(startTime, endTime, inclusiveStart)
+        query = sql.SQL('SELECT sname, time, {} FROM {}{} ORDER BY time, sname').format(
+            sql.SQL(', ').join(sql.Identifier(param) for param in params), sql.Identifier(tableName), where)
+        cur.execute(query, arguments)
+        while True:
+            rows = cur.fetchmany(self.chunkSize)
+            if len(rows) == 0:
+                break
+            self.scatter(rows)
+        cur.close()
+
+    def streamCopy(self, conn, tableName, params, startTime=None, endTime=None, inclusiveStart=True):
+        """
+        Streams the rows with COPY (SELECT ...) TO STDOUT in CSV format through a pipe and parses them in chunks.
+        Timestamps are sent as epoch microseconds, so every chunk is converted with vectorized operations only.
+        """
+        where, arguments = rangeCondition(startTime, endTime, inclusiveStart)
+        query = sql.SQL('COPY (SELECT sname, (extract(epoch FROM time) * 1000000)::bigint, {} FROM {}{}) '
+                        'TO STDOUT WITH (FORMAT csv)').format(
+            sql.SQL(', ').join(sql.Identifier(param) for param in params), sql.Identifier(tableName), where)
+        cur = conn.cursor()
+        query = cur.mogrify(query, arguments).decode()
+
+        # COPY writes into one end of the pipe while the chunks are parsed from the other end
+        readEnd, writeEnd = os.pipe()
+        reader, writer = os.fdopen(readEnd, 'rb'), os.fdopen(writeEnd, 'wb')
+        errors = []
+
+        def produce():
+            try:
+                cur.copy_expert(query, writer)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                writer.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        try:
+            stationIndex = pd.Index(self.stationIDs)
+            names = ['sname', 'time'] + list(params)
+            dtypes = {'sname': str if stationIndex.dtype == object else stationIndex.dtype, 'time': np.int64}
+            dtypes.update({param: np.float64 for param in params})
+            for chunk in pd.read_csv(reader, header=None, names=names, dtype=dtypes, chunksize=self.chunkSize):
+                columns = stationIndex.get_indexer(chunk['sname'])
+                if (columns < 0).any():
+                    raise ValueError('Error : station ' + str(chunk['sname'][columns < 0].iloc[0]) + ' is not in the extracted index')
+                positions = self.locate((chunk['time'].to_numpy() * 1000).view('datetime64[ns]'))
+                self.place(positions, columns, chunk[list(params)].to_numpy())
+        except pd.errors.EmptyDataError:
+            pass
+        finally:
+            # closing the reader stops the producer if parsing failed
+            reader.close()
+            producer.join()
+            cur.close()
+        if len(errors) > 0:
+            raise errors[0]
+
+    def getSensorData(self, tempPath, tableName='data', outputParam=13, startTime=None, endTime=None):
+        """
+        Connects to database and streams the values of the given parameter for every station in one query.
+        The values are scattered into a time x station matrix which is stored in a CSV file.
+
+        tempPath    : output file (.csv, .npy, .parquet or .feather), no file is written if None
+        tableName   : table containing soramame data
+        outputParam : position of the sensor column in the data table (default = 13, pm25)
+        startTime   : first timestamp to extract (inclusive), whole table if None
+        endTime     : last timestamp to extract (exclusive), whole table if None
+        """
+        self.time = [time.time()]
+
+        # Connecting to PostgreSQL server
+        conn = None
+        try:
+            self.param = getParameterName(outputParam)
+
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            self.extract(conn, tableName, [self.param], startTime, endTime)
+            self.matrix = self.cube[:, :, 0]
+
+            if tempPath is not None:
+                writeSensorMatrix(tempPath, self.timeStamps, self.stationIDs, self.matrix)
+                print("Created hourly sensor data")
+            self.time.append(time.time())
+            print('-------time taken for execution-------')
+            print('index query :', self.time[1] - self.time[0], ' sec')
+            print('stream and scatter :', self.time[2] - self.time[1], ' sec')
+            print('write output :', self.time[3] - self.time[2], ' sec')
+            print('Total time :', self.time[3] - self.time[0], ' sec')
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error)
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+    def getSensorCube(self, outputPath, tableName='data', outputParams=None, startTime=None, endTime=None):
+        """
+        Connects to database and reads all requested parameter columns of every station in a single table scan.
+        The result is kept as a time x station x parameter cube and one CSV file per parameter is written.
+
+        outputPath   : output file name, the parameter name is appended to it (e.g. out.csv -> out_pm25.csv),
+                       no file is written if None
+        tableName    : table containing soramame data
+        outputParams : list of parameter positions in the data table (default = all sensor parameters 3 to 18)
+        startTime    : first timestamp to extract (inclusive), whole table if None
+        endTime      : last timestamp to extract (exclusive), whole table if None
+        """
+        self.time = [time.time()]
+
+        # Connecting to PostgreSQL server
+        conn = None
+        try:
+            if outputParams is None:
+                outputParams = range(3, len(parameterNames) + 1)
+            params = [getParameterName(outputParam) for outputParam in outputParams]
+            self.matrix = None
+
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            self.extract(conn, tableName, params, startTime, endTime)
+
+            if outputPath is not None:
+                root, extension = os.path.splitext(outputPath)
+                for param in params:
+                    writeSensorMatrix(root + '_' + param + (extension or '.csv'), self.timeStamps, self.stationIDs,
+                                      self.cube[:, :, self.params.index(param)])
+                print("Created hourly sensor data for", len(params), "parameters")
+            self.time.append(time.time())
+            print('-------time taken for execution-------')
+            print('index query :', self.time[1] - self.time[0], ' sec')
+            print('stream and scatter :', self.time[2] - self.time[1], ' sec')
+            print('write output :', self.time[3] - self.time[2], ' sec')
+            print('Total time :', self.time[3] - self.time[0], ' sec')
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error)
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+    def refreshSensorData(self, outputFile, tableName='data', outputParam=13):
+        """
+        Incrementally refreshes an extracted CSV file.
+
+        The last extracted timestamp, the station columns and the number of rows are stored next to the output
+        in outputFile + '.watermark.json'. Only rows newer than the watermark are read from the database, columns
+        are added for newly appeared stations and the new rows are appended to the existing file.
+        The whole range is extracted if no watermark exists yet.
+
+        NOTE : rows inserted afterwards with a timestamp older than the watermark are not picked up
+
+        outputFile  : extracted CSV file to refresh
+        tableName   : table containing soramame data
+        outputParam : position of the sensor column in the data table (default = 13, pm25)
+        """
+        if getFormat(outputFile) != '.csv':
+            print('Error : incremental refresh only supports CSV output')
+            return
+        watermarkFile = outputFile + '.watermark.json'
+        if not os.path.isfile(watermarkFile) or not os.path.isfile(outputFile):
+            self.getSensorData(outputFile, tableName, outputParam)
+            if self.matrix is not None and len(self.timeStamps) > 0:
+                self.saveWatermark(watermarkFile, tableName, self.stationIDs, len(self.timeStamps))
+            return
+
+        with open(watermarkFile) as file:
+            watermark = json.load(file)
+        if watermark['table'] != tableName or watermark['param'] != getParameterName(outputParam):
+            print('Error : ' + outputFile + ' was extracted from ' + watermark['table'] + '.' + watermark['param'])
+            return
+
+        self.time = [time.time()]
+        conn = None
+        try:
+            self.param = watermark['param']
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            self.extract(conn, tableName, [self.param], startTime=watermark['lastTime'], inclusiveStart=False)
+            self.matrix = self.cube[:, :, 0]
+            if len(self.timeStamps) == 0:
+                print(outputFile + ' is up to date')
+                return
+
+            # existing stations keep their column, new stations are added at the end
+            stations = watermark['stations']
+            known = set(stations)
+            newStations = [station for station in self.stationIDs if station not in known]
+            if len(newStations) > 0:
+                self.addStationColumns(outputFile, newStations)
+                stations = stations + newStations
+
+            dataframe = self.toDataFrame().reindex(columns=['TimeStamp'] + stations)
+            dataframe.index = range(watermark['rows'], watermark['rows'] + len(dataframe))
+            dataframe.to_csv(outputFile, mode='a', header=False, na_rep='NaN')
+            self.saveWatermark(watermarkFile, tableName, stations, watermark['rows'] + len(dataframe))
+            self.time.append(time.time())
+            print('Appended', len(dataframe), 'rows and', len(newStations), 'stations to', outputFile)
+            print('Total time :', self.time[-1] - self.time[0], ' sec')
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error)
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+    def saveWatermark(self, watermarkFile, tableName, stations, rows):
+        """
+        Stores the last extracted timestamp, the station columns and the row count of an extracted file.
+        """
+        watermark = {'table': tableName, 'param': self.param, 'lastTime': str(pd.Timestamp(self.timeStamps[-1])),
+                     'stations': [station.item() if hasattr(station, 'item') else station for station in stations],
+                     'rows': rows}
+        with open(watermarkFile + '.tmp', 'w') as file:
+            json.dump(watermark, file)
+        os.replace(watermarkFile + '.tmp', watermarkFile)
+
+    def addStationColumns(self, outputFile, newStations):
+        """
+        Adds empty (NaN) columns for new stations to an extracted CSV file without parsing its values.
+        """
+        with open(outputFile) as inputFile, open(outputFile + '.tmp', 'w') as tempFile:
+            header = inputFile.readline().rstrip('\n')
+            tempFile.write(header + ',' + ','.join(str(station) for station in newStations) + '\n')
+            padding = ',NaN' * len(newStations) + '\n'
+            for line in inputFile:
+                tempFile.write(line.rstrip('\n') + padding)
+        os.replace(outputFile + '.tmp', outputFile)
+
+    def getSensorDataPartitioned(self, outputFile, checkpointDir, tableName='data', outputParam=13,
+                                 startTime=None, endTime=None, frequency='MS'):
+        """
+        Extracts the matrix in independent time partitions (monthly by default) and stitches the result.
+
+        Every partition is extracted in its own transaction and checkpointed in checkpointDir as a .npy matrix
+        (<table>_<param>_<start>_<end>.npy) when it completes. A restarted job skips the partitions that are already done, so only the partition
+        that failed is extracted again. Peak memory is bounded by the size of one partition.
+
+        outputFile    : output file (.csv or .npy are written partition by partition, .parquet and .feather in one go)
+        checkpointDir : directory keeping the completed partitions
+        tableName     : table containing soramame data
+        outputParam   : position of the sensor column in the data table (default = 13, pm25)
+        startTime     : first timestamp to extract (inclusive), first timestamp of the table if None
+        endTime       : last timestamp to extract (exclusive), whole table if None
+        frequency     : pandas frequency of the partition boundaries (default = 'MS', month start)
+        """
+        conn = None
+        try:
+            self.param = getParameterName(outputParam)
+            os.makedirs(checkpointDir, exist_ok=True)
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+
+            if startTime is None or endTime is None:
+                cur = conn.cursor()
+                cur.execute(sql.SQL('SELECT min(time), max(time) FROM {}').format(sql.Identifier(tableName)))
+                first, last = cur.fetchone()
+                cur.close()
+                conn.commit()
+                if first is None:
+                    print('Error : ' + tableName + ' is empty')
+                    return
+                startTime = first if startTime is None else startTime
+                # the boundary after the last timestamp keeps it inside the last partition
+                endTime = pd.Timestamp(last) + pd.Timedelta(hours=1) if endTime is None else endTime
+
+            startTime, endTime = pd.Timestamp(startTime), pd.Timestamp(endTime)
+            boundaries = pd.date_range(startTime, endTime, freq=frequency, normalize=True)
+            boundaries = [startTime] + [boundary for boundary in boundaries if startTime < boundary < endTime] + [endTime]
+
+            partitionFiles = []
+            for partitionStart, partitionEnd in zip(boundaries[:-1], boundaries[1:]):
+                # the table is part of the name, so a checkpoint of another table is never reused
+                partitionFile = os.path.join(checkpointDir, tableName + '_' + self.param + '_'
+                                             + partitionStart.strftime('%Y%m%d%H') + '_'
+                                             + partitionEnd.strftime('%Y%m%d%H') + '.npy')
+                partitionFiles.append(partitionFile)
+                if os.path.isfile(partitionFile + '.done'):
+                    continue
+
+                self.time = [time.time()]
+                self.extract(conn, tableName, [self.param], partitionStart.to_pydatetime(), partitionEnd.to_pydatetime())
+                conn.commit()
+                writeSensorMatrix(partitionFile, self.timeStamps, self.stationIDs, self.cube[:, :, 0])
+                # the marker is written last, an interrupted checkpoint is extracted again
+                open(partitionFile + '.done', 'w').close()
+                self.cube = None
+                print('Partition', partitionStart, '-', partitionEnd, ':', len(self.timeStamps), 'timestamps in',
+                      time.time() - self.time[0], ' sec')
+
+            self.stitchPartitions(partitionFiles, outputFile)
+            print("Created hourly sensor data from", len(partitionFiles), "partitions")
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error)
+            print('Completed partitions are kept in ' + checkpointDir + ', rerun to resume')
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+    def stitchPartitions(self, partitionFiles, outputFile):
+        """
+        Stitches checkpointed partitions into one output file. CSV and .npy outputs are written one partition
+        at a time, so only a single partition is held in memory.
+        """
+        stations = []
+        rows = 0
+        for partitionFile in partitionFiles:
+            with open(sidecarFiles(partitionFile)[1]) as file:
+                partitionStations = json.load(file)
+            known = set(stations)
+            stations.extend(station for station in partitionStations if station not in known)
+            rows += len(np.load(sidecarFiles(partitionFile)[0], mmap_mode='r'))
+
+        outputFormat = getFormat(outputFile)
+        if outputFormat == '.npy':
+            matrix = np.lib.format.open_memmap(outputFile, mode='w+', dtype=np.float32, shape=(rows, len(stations)))
+            allTimeStamps = np.empty(rows, dtype='datetime64[ns]')
+        elif outputFormat == '.csv':
+            pd.DataFrame(columns=['TimeStamp'] + stations).to_csv(outputFile)
+        else:
+            frames = []
+
+        position = 0
+        for partitionFile in partitionFiles:
+            timeStamps, partitionStations, values = loadSensorMatrix(partitionFile)
+            dataframe = pd.DataFrame(values, columns=partitionStations).reindex(columns=stations)
+            if outputFormat == '.npy':
+                matrix[position:position + len(timeStamps)] = dataframe.to_numpy()
+                allTimeStamps[position:position + len(timeStamps)] = timeStamps
+            else:
+                dataframe.insert(0, 'TimeStamp', timeStamps)
+                dataframe.index = range(position, position + len(timeStamps))
+                if outputFormat == '.csv':
+                    dataframe.to_csv(outputFile, mode='a', header=False, na_rep='NaN')
+                else:
+                    frames.append(dataframe)
+            position += len(timeStamps)
+
+        if outputFormat == '.npy':
+            matrix.flush()
+            del matrix
+            timeStampFile, stationFile = sidecarFiles(outputFile)
+            np.save(timeStampFile, allTimeStamps)
+            with open(stationFile, 'w') as file:
+                json.dump(stations, file)
+        elif outputFormat != '.csv':
+            dataframe = pd.concat(frames)
+            writeSensorMatrix(outputFile, dataframe['TimeStamp'].to_numpy(), stations, dataframe.iloc[:, 1:].to_numpy())
+
+    def toDataFrame(self, param=None):
+        """
+        Wraps the extracted values of a parameter as a dataframe with a TimeStamp column followed by one column per station.
+
+        param : name of the parameter to wrap, the single extracted parameter if None
+        """
+        if param is None:
+            matrix = self.matrix if self.matrix is not None else self.cube[:, :, 0]
+        else:
+            matrix = self.cube[:, :, self.params.index(param)]
+        dataframe = pd.DataFrame(matrix, columns=self.stationIDs)
+        dataframe.insert(0, 'TimeStamp', self.timeStamps)
+        return dataframe
+
+
+if __name__ == "__main__":
+    # optional --checkpoint=DIR argument selects the partitioned, resumable extraction
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv if arg.startswith('--'))
+    sys.argv = [arg for arg in sys.argv if not arg.startswith('--')]
+    if 2 <= len(sys.argv) <= 6:
+        print(len(sys.argv), "input args")
+        dataExtraction = soramameSensorData()
+        tableName = sys.argv[2] if len(sys.argv) > 2 else 'data'
+        startTime = sys.argv[4] if len(sys.argv) > 4 else None
+        endTime = sys.argv[5] if len(sys.argv) > 5 else None
+        if len(sys.argv) > 3 and sys.argv[3] == 'all':
+            dataExtraction.getSensorCube(outputPath=sys.argv[1], tableName=tableName,
+                                         startTime=startTime, endTime=endTime)
+        elif len(sys.argv) > 4 and sys.argv[4] == 'refresh':
+            dataExtraction.refreshSensorData(outputFile=sys.argv[1], tableName=tableName, outputParam=int(sys.argv[3]))
+        elif 'checkpoint' in options:
+            dataExtraction.getSensorDataPartitioned(outputFile=sys.argv[1], checkpointDir=options['checkpoint'],
+                                                    tableName=tableName,
+                                                    outputParam=int(sys.argv[3]) if len(sys.argv) > 3 else 13,
+                                                    startTime=startTime, endTime=endTime,
+                                                    frequency=options.get('frequency', 'MS'))
+        else:
+            dataExtraction.getSensorData(tempPath=sys.argv[1], tableName=tableName,
+                                         outputParam=int(sys.argv[3]) if len(sys.argv) > 3 else 13,
+                                         startTime=startTime, endTime=endTime)
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> outputFileName, tablename (default = data), "
+              "outputParam (default = pm25, all = every parameter in one scan), "
+              "start time (refresh = incremental refresh of outputFileName), end time, "
+              "--checkpoint=DIR (partitioned extraction), --frequency=MS (partition size)")
@@ -0,0 +1,115 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+
+import dbSession
+try:
+    from ETL.ETL_pivot import getParameterName
+    from ETL.sensorMatrixFile import writeSensorMatrix
+except ImportError:
+    # run as a script from the ETL folder, where ETL is ETL.py and not the package
+    from ETL_pivot import getParameterName
+    from sensorMatrixFile import writeSensorMatrix
+
+# statistics available in the rollup tables
+statistics = {'count': 'n', 'sum': 'total', 'min': 'minimum', 'max': 'maximum', 'mean': 'total / NULLIF(n, 0)'}
+
+# rollup tables and their time column per grain
+grains = {'day': ('rollup_daily', 'day'), 'month': ('rollup_monthly', 'month')}
+
+
+class soramameRollupData:
+    """
+    Reads the daily or monthly rollups maintained by the ingestion (storingDataInDatabase/rollups.py)
+    as a (day or month) x station matrix, so coarse-grained analyses do not need the hourly data.
+    """
+
+    def __init__(self):
+        self.timeStamps = None
+        self.stationIDs = None
+        self.matrix = None
+        self.time = []
+
+    def getRollupData(self, outputFile, outputParam=13, grain='month', statistic='mean', threshold=None,
+                      startTime=None, endTime=None):
+        """
+        Extracts one statistic of the rollups into a time x station matrix and stores it (CSV or binary output
+        depending on the file extension).
+
+        outputFile  : output file, no file is written if None
+        outputParam : position of the sensor column in the data table (default = 13, pm25)
+        grain       : 'day' or 'month'
+        statistic   : 'count' (valid hours), 'sum', 'min', 'max', 'mean' or 'exceedance' (hours above threshold)
+        threshold   : threshold of the exceedance statistic, one of the thresholds in rollup_threshold
+        startTime   : first day/month (inclusive), all rollups if None
+        endTime     : last day/month (exclusive), all rollups if None
+        """
+        self.time = [time.time()]
+        if grain not in grains:
+            raise ValueError('Error : unknown grain ' + str(grain))
+        if statistic not in statistics and statistic != 'exceedance':
+            raise ValueError('Error : unknown statistic ' + str(statistic))
+        table, timeColumn = grains[grain]
+        arguments = [getParameterName(outputParam)]
+        if statistic == 'exceedance':
+            if threshold is None:
+                raise ValueError('Error : the exceedance statistic needs a threshold')
+            table = table + '_exceedance'
+            value = sql.SQL('n_over')
+            condition = sql.SQL(' AND threshold = %s')
+            arguments.append(threshold)
+        else:
+            value = sql.SQL(statistics[statistic])
+            condition = sql.SQL('')
+        if startTime is not None:
+            condition += sql.SQL(' AND {} >= %s').format(sql.Identifier(timeColumn))
+            arguments.append(startTime)
+        if endTime is not None:
+            condition += sql.SQL(' AND {} < %s').format(sql.Identifier(timeColumn))
+            arguments.append(endTime)
+        query = sql.SQL('SELECT {time}, sname, {value} FROM {table} WHERE param = %s{condition}').format(
+            time=sql.Identifier(timeColumn), value=value, table=sql.Identifier(table), condition=condition)
+
+        conn = None
+        try:
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            cur = conn.cursor()
+            cur.execute(query, arguments)
+            rows = cur.fetchall()
+            cur.close()
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+
+        dataframe = pd.DataFrame(rows, columns=['TimeStamp', 'sname', 'value'])
+        dataframe = dataframe.pivot(index='TimeStamp', columns='sname', values='value').sort_index()
+        self.timeStamps = pd.to_datetime(dataframe.index).to_numpy()
+        self.stationIDs = list(dataframe.columns)
+        self.matrix = dataframe.to_numpy(dtype=np.float64)
+        if outputFile is not None:
+            writeSensorMatrix(outputFile, self.timeStamps, self.stationIDs, self.matrix)
+            print("Created", grain, "rollup data")
+        self.time.append(time.time())
+        print('Total time :', self.time[1] - self.time[0], ' sec')
+        return self.matrix
+
+
+if __name__ == "__main__":
+    if 2 <= len(sys.argv) <= 8:
+        rollupData = soramameRollupData()
+        rollupData.getRollupData(outputFile=sys.argv[1],
+                                 outputParam=int(sys.argv[2]) if len(sys.argv) > 2 else 13,
+                                 grain=sys.argv[3] if len(sys.argv) > 3 else 'month',
+                                 statistic=sys.argv[4] if len(sys.argv) > 4 else 'mean',
+                                 threshold=float(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5] != '-' else None,
+                                 startTime=sys.argv[6] if len(sys.argv) > 6 else None,
+                                 endTime=sys.argv[7] if len(sys.argv) > 7 else None)
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> outputFileName, outputParam (default = pm25), grain (day, month), "
+              "statistic (count, sum, min, max, mean, exceedance), threshold (- for none), start time, end time")
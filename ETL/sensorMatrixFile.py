@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# file extensions of the supported binary formats
+binaryFormats = ['.npy', '.parquet', '.feather']
+
+
+def getFormat(fileName):
+    """
+    Returns the format of an extracted sensor file from its extension ('.csv' for unknown extensions).
+    """
+    extension = os.path.splitext(fileName)[1].lower()
+    return extension if extension in binaryFormats else '.csv'
+
+
+def sidecarFiles(fileName):
+    """
+    Returns the timestamp and station index files stored next to a raw .npy matrix.
+    """
+    root = os.path.splitext(fileName)[0]
+    return root + '.timestamps.npy', root + '.stations.json'
+
+
+def writeSensorMatrix(outputFile, timeStamps, stationIDs, matrix):
+    """
+    Stores a time x station matrix in the format given by the extension of outputFile.
+
+    .csv     : text file with a row number, TimeStamp and one column per station (missing values written as NaN)
+    .parquet : float32 columnar file with a TimeStamp column and one column per station (requires pyarrow)
+    .feather : same layout as parquet, uncompressed so that it can be memory mapped
+    .npy     : raw float32 matrix with <name>.timestamps.npy and <name>.stations.json index files
+
+    outputFile : output file name
+    timeStamps : timestamps of the matrix rows
+    stationIDs : stationIDs of the matrix columns
+    matrix     : time x station values, NaN for missing values
+    """
+    outputFormat = getFormat(outputFile)
+    if outputFormat == '.npy':
+        timeStampFile, stationFile = sidecarFiles(outputFile)
+        np.save(outputFile, np.asarray(matrix, dtype=np.float32))
+        np.save(timeStampFile, np.asarray(timeStamps, dtype='datetime64[ns]'))
+        with open(stationFile, 'w') as file:
+            json.dump([str(station) for station in stationIDs], file)
+        return
+
+    if outputFormat == '.csv':
+        dataframe = pd.DataFrame(matrix, columns=stationIDs)
+        dataframe.insert(0, 'TimeStamp', timeStamps)
+        dataframe.to_csv(outputFile, na_rep='NaN')
+        return
+
+    # parquet and feather need string column names
+    dataframe = pd.DataFrame(np.asarray(matrix, dtype=np.float32), columns=[str(station) for station in stationIDs])
+    dataframe.insert(0, 'TimeStamp', timeStamps)
+    if outputFormat == '.parquet':
+        dataframe.to_parquet(outputFile, index=False)
+    else:
+        dataframe.to_feather(outputFile, compression='uncompressed')
+
+
+def writeSensorFrame(outputFile, dataframe):
+    """
+    Stores a dataframe with a TimeStamp column followed by one column per station in the format given by
+    the extension of outputFile (see writeSensorMatrix).
+    """
+    if getFormat(outputFile) == '.csv':
+        dataframe.to_csv(outputFile, na_rep='NaN')
+        return
+    values = dataframe.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').to_numpy()
+    writeSensorMatrix(outputFile, pd.to_datetime(dataframe['TimeStamp']).to_numpy(), dataframe.columns[1:], values)
+
+
+def loadSensorMatrix(inputFile, mmap=True):
+    """
+    Loads an extracted sensor file as (timeStamps, stationIDs, matrix) without building a dataframe.
+
+    inputFile : extracted file (.csv, .parquet, .feather or .npy)
+    mmap      : memory map binary files instead of reading them into memory
+    """
+    inputFormat = getFormat(inputFile)
+    if inputFormat == '.npy':
+        timeStampFile, stationFile = sidecarFiles(inputFile)
+        matrix = np.load(inputFile, mmap_mode='r' if mmap else None)
+        timeStamps = np.load(timeStampFile)
+        with open(stationFile) as file:
+            stationIDs = json.load(file)
+        return timeStamps, stationIDs, matrix
+
+    if inputFormat == '.feather':
+        from pyarrow import feather
+        dataframe = feather.read_table(inputFile, memory_map=mmap).to_pandas()
+    elif inputFormat == '.parquet':
+        dataframe = pd.read_parquet(inputFile, memory_map=mmap)
+    else:
+        dataframe = pd.read_csv(inputFile, index_col=0, parse_dates=['TimeStamp'])
+    return dataframe['TimeStamp'].to_numpy(), list(dataframe.columns[1:]), dataframe.iloc[:, 1:].to_numpy()
+
+
+def readSensorMatrix(inputFile, mmap=True):
+    """
+    Reads an extracted sensor file into a dataframe with the same layout as pd.read_csv of the CSV output
+    (row number column, TimeStamp column and one column per station).
+
+    inputFile : extracted file (.csv, .parquet, .feather or .npy)
+    mmap      : memory map binary files instead of reading them into memory
+    """
+    if getFormat(inputFile) == '.csv':
+        return pd.read_csv(inputFile)
+    timeStamps, stationIDs, matrix = loadSensorMatrix(inputFile, mmap)
+    dataframe = pd.DataFrame(matrix, columns=stationIDs, copy=False)
+    dataframe.insert(0, 'TimeStamp', timeStamps)
+    dataframe.insert(0, 'Unnamed: 0', np.arange(len(dataframe)))
+    return dataframe
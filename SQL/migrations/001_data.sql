@@ -0,0 +1,38 @@
+-- Hourly soramame sensor data, partitioned by month on time.
+-- The primary key (sname, time) serves the per-station extraction (WHERE sname = ... ORDER BY time) and the
+-- ON CONFLICT upserts of the ingestion. The BRIN index serves time range scans and SELECT DISTINCT time.
+-- Monthly partitions are added by SQL.schema.ensurePartitions as data arrives.
+
+CREATE TABLE IF NOT EXISTS data (
+    sname integer NOT NULL,
+    time timestamp NOT NULL,
+    so2 double precision,
+    no double precision,
+    no2 double precision,
+    nox double precision,
+    co double precision,
+    ox double precision,
+    nmhc double precision,
+    ch4 double precision,
+    thc double precision,
+    spm double precision,
+    pm25 double precision,
+    sp double precision,
+    wd double precision,
+    ws double precision,
+    temp double precision,
+    hum double precision,
+    PRIMARY KEY (sname, time)
+) PARTITION BY RANGE (time);
+
+CREATE INDEX IF NOT EXISTS data_time_brin ON data USING brin (time);
+
+-- Files loaded by storingDataInDatabase.insertZipFolderInDatabase
+CREATE TABLE IF NOT EXISTS ingest_manifest (
+    table_name varchar NOT NULL,
+    file_name varchar NOT NULL,
+    sha256 char(64) NOT NULL,
+    rows integer,
+    loaded_at timestamp DEFAULT now(),
+    PRIMARY KEY (table_name, file_name)
+);
@@ -0,0 +1,11 @@
+-- Station information (data/stationInfo.csv) with a spatial index for radius and nearest station lookups.
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE TABLE IF NOT EXISTS station_info (
+    sid integer PRIMARY KEY,
+    geog geography(POINT, 4326),
+    addressinfo varchar
+);
+
+CREATE INDEX IF NOT EXISTS station_info_geog ON station_info USING gist (geog);
@@ -0,0 +1,56 @@
+-- Daily and monthly rollups per station and parameter, maintained by the ingestion for the stations and days
+-- of every loaded file (storingDataInDatabase.rollups). Missing values (-1000/9999) are not counted.
+
+CREATE TABLE IF NOT EXISTS rollup_threshold (
+    param varchar NOT NULL,
+    threshold double precision NOT NULL,
+    PRIMARY KEY (param, threshold)
+);
+
+INSERT INTO rollup_threshold (param, threshold) VALUES
+    ('pm25', 15), ('pm25', 35), ('pm25', 50), ('pm25', 75),
+    ('spm', 100), ('ox', 60), ('no2', 60), ('so2', 40)
+ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    sname integer NOT NULL,
+    param varchar NOT NULL,
+    day date NOT NULL,
+    n integer NOT NULL,
+    total double precision,
+    minimum double precision,
+    maximum double precision,
+    PRIMARY KEY (sname, param, day)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_daily_exceedance (
+    sname integer NOT NULL,
+    param varchar NOT NULL,
+    day date NOT NULL,
+    threshold double precision NOT NULL,
+    n_over integer NOT NULL,
+    PRIMARY KEY (sname, param, day, threshold)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_monthly (
+    sname integer NOT NULL,
+    param varchar NOT NULL,
+    month date NOT NULL,
+    n integer NOT NULL,
+    total double precision,
+    minimum double precision,
+    maximum double precision,
+    PRIMARY KEY (sname, param, month)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_monthly_exceedance (
+    sname integer NOT NULL,
+    param varchar NOT NULL,
+    month date NOT NULL,
+    threshold double precision NOT NULL,
+    n_over integer NOT NULL,
+    PRIMARY KEY (sname, param, month, threshold)
+);
+
+CREATE INDEX IF NOT EXISTS rollup_daily_param_day ON rollup_daily (param, day);
+CREATE INDEX IF NOT EXISTS rollup_monthly_param_month ON rollup_monthly (param, month);
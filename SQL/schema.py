@@ -0,0 +1,124 @@
+import os
+import sys
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+import dbSession
+
+# directory of the versioned DDL files (<version>_<name>.sql, applied in version order)
+migrationFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def getMigrations():
+    """
+    Returns the (version, name, path) of every DDL file in the migrations folder, ordered by version.
+    """
+    migrations = []
+    for fileName in os.listdir(migrationFolder):
+        if fileName.endswith('.sql'):
+            version, name = fileName[:-4].split('_', 1)
+            migrations.append((int(version), name, os.path.join(migrationFolder, fileName)))
+    return sorted(migrations)
+
+
+def migrate(conn):
+    """
+    Applies the DDL files that are not yet recorded in the schema_version table, each in its own transaction.
+    Returns the list of applied versions.
+    """
+    cur = conn.cursor()
+    cur.execute('CREATE TABLE IF NOT EXISTS schema_version (version integer PRIMARY KEY, name varchar NOT NULL, '
+                'applied_at timestamp DEFAULT now())')
+    conn.commit()
+    cur.execute('SELECT version FROM schema_version')
+    applied = {row[0] for row in cur.fetchall()}
+
+    newVersions = []
+    for version, name, path in getMigrations():
+        if version in applied:
+            continue
+        with open(path, encoding='utf-8') as file:
+            cur.execute(file.read())
+        cur.execute('INSERT INTO schema_version (version, name) VALUES (%s, %s)', (version, name))
+        conn.commit()
+        print('Applied schema version', version, name)
+        newVersions.append(version)
+    cur.close()
+    return newVersions
+
+
+def isPartitioned(cur, tableName):
+    """
+    Returns True if tableName is a partitioned table.
+    """
+    cur.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', (tableName,))
+    return cur.fetchone() is not None
+
+
+def ensurePartitions(cur, tableName, months):
+    """
+    Creates the missing monthly partitions of a partitioned table.
+    Nothing is done if the table is not partitioned.
+
+    tableName : partitioned table (e.g. data)
+    months    : timestamps inside the months that need a partition
+    """
+    if not isPartitioned(cur, tableName):
+        return []
+    created = []
+    for month in sorted({pd.Timestamp(month).to_period('M') for month in months}):
+        partition = tableName + '_y' + str(month.year) + 'm' + str(month.month).zfill(2)
+        # existing partitions are found without a lock, so loaders of the same month do not wait for each other
+        cur.execute('SELECT to_regclass(%s)', (partition,))
+        if cur.fetchone()[0] is not None:
+            continue
+        # serializes concurrent loaders creating the same partition, the check is repeated under the lock
+        cur.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (partition,))
+        cur.execute('SELECT to_regclass(%s)', (partition,))
+        if cur.fetchone()[0] is not None:
+            continue
+        cur.execute(sql.SQL('CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)').format(
+            sql.Identifier(partition), sql.Identifier(tableName)),
+            (month.start_time.to_pydatetime(), (month + 1).start_time.to_pydatetime()))
+        created.append(partition)
+    return created
+
+
+def createSchema(startTime=None, endTime=None, tableName='data'):
+    """
+    Applies the pending DDL files and creates the monthly partitions between startTime and endTime.
+
+    startTime : first month to create a partition for (optional)
+    endTime   : last month to create a partition for (optional, default = startTime)
+    tableName : partitioned data table
+    """
+    conn = None
+    try:
+        print('Connecting to the PostgreSQL database...')
+        conn = dbSession.connect()
+        migrate(conn)
+        if startTime is not None:
+            cur = conn.cursor()
+            months = pd.period_range(startTime, endTime or startTime, freq='M').to_timestamp()
+            created = ensurePartitions(cur, tableName, months)
+            conn.commit()
+            cur.close()
+            print('Created partitions :', ', '.join(created) if len(created) > 0 else 'none')
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    finally:
+        if conn is not None:
+            dbSession.release(conn)
+            print('Database connection released.')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 4:
+        createSchema(startTime=sys.argv[1] if len(sys.argv) > 1 else None,
+                     endTime=sys.argv[2] if len(sys.argv) > 2 else None,
+                     tableName=sys.argv[3] if len(sys.argv) > 3 else 'data')
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> first month (e.g. 2018-01), last month, table name (default = data)")
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+import json
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+
+from config import config
+
+# section of database.ini used when no section is given
+defaultSection = 'postgresql'
+
+# connection parameters per (file, section), database.ini is parsed once per process
+configCache = {}
+
+# connection pool per section, together with the pid of the process that created it
+pools = {}
+
+# pools inherited from the parent process by fork, kept referenced so that the parent connections are never
+# closed (and terminated on the server) by the garbage collector of the child
+inheritedPools = []
+
+poolLock = threading.Lock()
+
+# per query statistics {query : {'calls', 'seconds', 'rows'}}
+metrics = {}
+metricsLock = threading.Lock()
+
+
+def getConfig(filename='database.ini', section=None):
+    """
+    Returns the connection parameters of a section of database.ini, read once per process.
+    """
+    key = (filename, section or defaultSection)
+    if key not in configCache:
+        configCache[key] = config(filename, key[1])
+    return dict(configCache[key])
+
+
+def useSection(section):
+    """
+    Makes section the default section of database.ini for all connections, e.g. a local PostgreSQL
+    used as stand-in for the production server.
+    """
+    global defaultSection
+    defaultSection = section
+
+
+def queryLabel(query):
+    """
+    Returns the label a query is recorded under in the metrics (whitespace normalised, truncated).
+    """
+    return ' '.join(str(query).split())[:160]
+
+
+def record(query, duration, rows):
+    label = queryLabel(query)
+    with metricsLock:
+        entry = metrics.setdefault(label, {'calls': 0, 'seconds': 0.0, 'rows': 0})
+        entry['calls'] += 1
+        entry['seconds'] += duration
+        entry['rows'] += max(rows, 0)
+
+
+class instrumentedCursor(psycopg2.extensions.cursor):
+    """
+    Cursor recording the duration and the row count of every execute and COPY in the metrics.
+    """
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record(query.as_string(self) if isinstance(query, sql.Composable) else query,
+                   time.perf_counter() - start, self.rowcount)
+
+    def copy_expert(self, query, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(query, file, size)
+        finally:
+            record(query, time.perf_counter() - start, self.rowcount)
+
+
+class sessionConnection(psycopg2.extensions.connection):
+    """
+    Connection remembering the statements prepared on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def getPool(section=None, maxConnections=None):
+    """
+    Returns the process-wide connection pool of a section of database.ini. A pool is created on first use,
+    and again in a child process, which must not share the connections of its parent.
+
+    maxConnections : grows the pool to at least this many connections (default = 16)
+    """
+    section = section or defaultSection
+    with poolLock:
+        pool, pid = pools.get(section, (None, None))
+        if pool is not None and pid != os.getpid():
+            inheritedPools.append(pool)
+            pool = None
+        if pool is None:
+            pool = ThreadedConnectionPool(0, max(maxConnections or 16, 1), connection_factory=sessionConnection,
+                                          cursor_factory=instrumentedCursor, **getConfig(section=section))
+            pool.minconn = pool.maxconn
+            # No connection is opened up front, but the pool keeps every released connection (it closes those
+            # beyond minconn), so connections and their prepared statements are reused
+            pools[section] = (pool, os.getpid())
+        elif maxConnections is not None and maxConnections > pool.maxconn:
+            pool.maxconn = pool.minconn = maxConnections
+        return pool
+
+
+def connect(section=None):
+    """
+    Borrows a connection from the pool, to be given back with release.
+    """
+    return getPool(section).getconn()
+
+
+def release(conn, section=None):
+    """
+    Gives a connection back to the pool. An open transaction is rolled back, closed connections are discarded.
+    """
+    if not conn.closed:
+        conn.rollback()
+    getPool(section).putconn(conn, close=bool(conn.closed))
+
+
+def executePrepared(cur, name, query, arguments):
+    """
+    Executes a hot query as a prepared statement. The statement is prepared once per connection.
+
+    name      : name of the prepared statement, must identify the query text
+    query     : query (string or psycopg2.sql composition) with $1, $2, ... placeholders
+    arguments : values of the placeholders
+    """
+    if name not in cur.connection.prepared:
+        cur.execute(sql.SQL('PREPARE {} AS ').format(sql.Identifier(name)) +
+                    (sql.SQL(query) if isinstance(query, str) else query))
+        cur.connection.prepared.add(name)
+    if len(arguments) == 0:
+        cur.execute(sql.SQL('EXECUTE {}').format(sql.Identifier(name)))
+    else:
+        cur.execute(sql.SQL('EXECUTE {} ({})').format(sql.Identifier(name),
+                                                     sql.SQL(', ').join(sql.Placeholder() * len(arguments))), arguments)
+
+
+def getMetrics():
+    """
+    Returns the statistics of the queries executed by this process, slowest total first.
+    """
+    with metricsLock:
+        entries = [dict(query=label, **entry) for label, entry in metrics.items()]
+    return sorted(entries, key=lambda entry: entry['seconds'], reverse=True)
+
+
+def resetMetrics():
+    with metricsLock:
+        metrics.clear()
+
+
+def exportMetrics(outputFile):
+    """
+    Writes the query statistics of this process as JSON lines (query, calls, seconds, rows).
+    """
+    with open(outputFile, 'w') as file:
+        for entry in getMetrics():
+            file.write(json.dumps(entry) + '\n')
+
+
+def printMetrics(top=10):
+    print('-------query time-------')
+    for entry in getMetrics()[:top]:
+        print(round(entry['seconds'], 3), 'sec', entry['calls'], 'calls', entry['rows'], 'rows :', entry['query'])
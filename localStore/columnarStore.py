@@ -0,0 +1,218 @@
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ETL.ETL_pivot import getParameterName, parameterNames
+from ETL.sensorMatrixFile import writeSensorMatrix
+from storingDataInDatabase.soramameParser import parseSoramameFile
+from storingDataInDatabase.unZipAirPollution import iterMemberContents
+
+# sensor parameters stored by the columnar store, in the column order of the soramame files
+storeParameters = parameterNames[2:]
+
+# number of chunks kept memory mapped for writing before they are flushed and closed
+maxOpenChunks = 256
+
+
+class soramameColumnarStore:
+    """
+    Embedded columnar store of soramame data, used without a PostgreSQL server.
+
+    Every parameter is kept in chunks of chunkHours hours, stored as float32 .npy matrices
+    (<storeFolder>/<param>/<chunk>.npy) indexed by hour offset from origin and station ordinal.
+    The station dictionary (stationID -> ordinal) is kept in stations.json. Chunks are memory mapped,
+    so extracting a time range for a parameter is array slicing.
+
+    storeFolder : directory of the store, created if it does not exist
+    chunkHours  : hours per chunk (default = 31 days)
+    origin      : timestamp of hour offset 0
+    NOTE : a store supports a single writer at a time
+    """
+
+    def __init__(self, storeFolder, chunkHours=744, origin='2000-01-01 00:00:00'):
+        self.storeFolder = storeFolder
+        self.metaFile = os.path.join(storeFolder, 'meta.json')
+        self.stationFile = os.path.join(storeFolder, 'stations.json')
+        if os.path.isfile(self.metaFile):
+            with open(self.metaFile) as file:
+                self.meta = json.load(file)
+            with open(self.stationFile) as file:
+                self.stationIDs = json.load(file)
+        else:
+            os.makedirs(storeFolder, exist_ok=True)
+            self.meta = {'chunkHours': chunkHours, 'origin': str(pd.Timestamp(origin)), 'first': None, 'last': None}
+            self.stationIDs = []
+        self.stationIndex = {station: i for i, station in enumerate(self.stationIDs)}
+        self.origin = np.datetime64(pd.Timestamp(self.meta['origin']), 'h')
+        self.timeStamps = None
+        self.matrix = None
+        # chunks memory mapped for writing {(param, chunk) : matrix}, written to disk by flush
+        self.openChunks = {}
+
+    def chunkFile(self, param, chunk):
+        return os.path.join(self.storeFolder, param, str(chunk) + '.npy')
+
+    def saveMeta(self):
+        for fileName, content in [(self.stationFile, self.stationIDs), (self.metaFile, self.meta)]:
+            with open(fileName + '.tmp', 'w') as file:
+                json.dump(content, file)
+            os.replace(fileName + '.tmp', fileName)
+
+    def getOrdinals(self, stations):
+        """
+        Returns the ordinals of the given stationIDs, adding new stations to the dictionary.
+        """
+        for station in np.unique(stations):
+            if int(station) not in self.stationIndex:
+                self.stationIndex[int(station)] = len(self.stationIDs)
+                self.stationIDs.append(int(station))
+        return np.fromiter((self.stationIndex[int(station)] for station in stations), dtype=np.intp, count=len(stations))
+
+    def flush(self):
+        """
+        Writes the chunks memory mapped for writing to disk and closes them.
+        """
+        for matrix in self.openChunks.values():
+            matrix.flush()
+        self.openChunks.clear()
+
+    def openChunk(self, param, chunk, width):
+        """
+        Memory maps a chunk for writing, creating it or widening it to at least width stations if needed.
+        Chunks are widened to twice their width, so that adding stations one by one rewrites every chunk only
+        O(log stations) times. Columns beyond the station dictionary (stations.json) are unused and stay NaN.
+        Opened chunks stay mapped until flush, so that consecutive files do not reopen and sync them.
+        """
+        matrix = self.openChunks.get((param, chunk))
+        if matrix is not None and matrix.shape[1] >= width:
+            return matrix
+        if matrix is not None:
+            matrix.flush()
+            del self.openChunks[(param, chunk)]
+        elif len(self.openChunks) >= maxOpenChunks:
+            self.flush()
+
+        fileName = self.chunkFile(param, chunk)
+        chunkHours = self.meta['chunkHours']
+        if not os.path.isfile(fileName):
+            os.makedirs(os.path.dirname(fileName), exist_ok=True)
+            matrix = np.lib.format.open_memmap(fileName, mode='w+', dtype=np.float32, shape=(chunkHours, width))
+            matrix[:] = np.nan
+        else:
+            matrix = np.load(fileName, mmap_mode='r+')
+            if matrix.shape[1] < width:
+                wider = np.full((chunkHours, max(width, 2 * matrix.shape[1])), np.nan, dtype=np.float32)
+                wider[:, :matrix.shape[1]] = matrix
+                del matrix
+                np.save(fileName, wider)
+                matrix = np.load(fileName, mmap_mode='r+')
+        self.openChunks[(param, chunk)] = matrix
+        return matrix
+
+    def write(self, stations, timeStamps, values):
+        """
+        Writes parsed rows (stationIDs, timestamps, stations x parameters values) into the chunks.
+        The chunks are written to disk by flush (called at the end of ingestCsvFile and ingestZipFile).
+        """
+        if len(stations) == 0:
+            return
+        columns = self.getOrdinals(stations)
+        offsets = (timeStamps.astype('datetime64[h]') - self.origin).astype(np.int64)
+        chunks = np.floor_divide(offsets, self.meta['chunkHours'])
+        positions = offsets - chunks * self.meta['chunkHours']
+        for chunk in np.unique(chunks):
+            rows = chunks == chunk
+            for p, param in enumerate(storeParameters):
+                matrix = self.openChunk(param, int(chunk), len(self.stationIDs))
+                matrix[positions[rows], columns[rows]] = values[rows, p]
+        first, last = str(timeStamps.min().astype('datetime64[h]')), str(timeStamps.max().astype('datetime64[h]'))
+        self.meta['first'] = first if self.meta['first'] is None else min(first, self.meta['first'])
+        self.meta['last'] = last if self.meta['last'] is None else max(last, self.meta['last'])
+        self.saveMeta()
+
+    def ingestCsvFile(self, inputFile):
+        """
+        Ingests one soramame CSV file (cp932).
+        """
+        stations, timeStamps, values = parseSoramameFile(inputFile)
+        self.write(stations, timeStamps, values.astype(np.float32))
+        self.flush()
+        return len(stations)
+
+    def ingestZipFile(self, inputZipFile, unzipWorkers=None):
+        """
+        Ingests every CSV file of a soramame zip file (and of nested zip files) without unzipping it to disk.
+
+        unzipWorkers : decompress the files in this many processes while ingesting (default = in this process)
+        """
+        start = time.time()
+        rows = 0
+        for memberName, content in iterMemberContents(inputZipFile, parallel=unzipWorkers is not None,
+                                                      workers=unzipWorkers):
+            try:
+                stations, timeStamps, values = parseSoramameFile(io.BytesIO(content))
+                self.write(stations, timeStamps, values.astype(np.float32))
+                rows += len(stations)
+            except Exception as error:
+                print(error, memberName)
+        self.flush()
+        print('Ingested', rows, 'rows in', time.time() - start, ' sec')
+        return rows
+
+    def getSensorData(self, tempPath, outputParam=13, startTime=None, endTime=None):
+        """
+        Extracts the hourly time x station matrix of a parameter, like soramameSensorData.getSensorData,
+        by slicing the memory mapped chunks. Hours without data and stations without data in a chunk are NaN.
+
+        tempPath    : output file (.csv, .npy, .parquet or .feather), no file is written if None
+        outputParam : position of the sensor column in the data table (default = 13, pm25)
+        startTime   : first timestamp to extract (inclusive), first stored hour if None
+        endTime     : last timestamp to extract (exclusive), after the last stored hour if None
+        """
+        param = getParameterName(outputParam)
+        self.flush()
+        if self.meta['first'] is None:
+            print('Error : the store is empty')
+            return None
+        start = np.datetime64(pd.Timestamp(startTime if startTime is not None else self.meta['first']), 'h')
+        end = (np.datetime64(pd.Timestamp(endTime), 'h') if endTime is not None
+               else np.datetime64(pd.Timestamp(self.meta['last']), 'h') + 1)
+        chunkHours = self.meta['chunkHours']
+        startOffset, endOffset = int((start - self.origin).astype(np.int64)), int((end - self.origin).astype(np.int64))
+
+        self.matrix = np.full((max(endOffset - startOffset, 0), len(self.stationIDs)), np.nan, dtype=np.float32)
+        for chunk in range(startOffset // chunkHours, (endOffset - 1) // chunkHours + 1):
+            fileName = self.chunkFile(param, chunk)
+            if not os.path.isfile(fileName):
+                continue
+            chunkMatrix = np.load(fileName, mmap_mode='r')
+            first = max(startOffset, chunk * chunkHours)
+            last = min(endOffset, (chunk + 1) * chunkHours)
+            # chunks may be wider than the station dictionary (unused capacity) or narrower (older chunks)
+            width = min(chunkMatrix.shape[1], len(self.stationIDs))
+            self.matrix[first - startOffset:last - startOffset, :width] = \
+                chunkMatrix[first - chunk * chunkHours:last - chunk * chunkHours, :width]
+        self.timeStamps = (start + np.arange(len(self.matrix))).astype('datetime64[ns]')
+        if tempPath is not None:
+            writeSensorMatrix(tempPath, self.timeStamps, self.stationIDs, self.matrix)
+            print("Created hourly sensor data")
+        return self.matrix
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1].endswith('.zip'):
+        soramameColumnarStore(sys.argv[2]).ingestZipFile(sys.argv[1])
+    elif 3 <= len(sys.argv) <= 6:
+        soramameColumnarStore(sys.argv[1]).getSensorData(sys.argv[2],
+                                                         outputParam=int(sys.argv[3]) if len(sys.argv) > 3 else 13,
+                                                         startTime=sys.argv[4] if len(sys.argv) > 4 else None,
+                                                         endTime=sys.argv[5] if len(sys.argv) > 5 else None)
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Ingest-> zip file, store folder")
+        print("Extract-> store folder, outputFileName, outputParam (default = pm25), start time, end time")
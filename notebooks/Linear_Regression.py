@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
@@ -17,10 +18,17 @@ class DataImputer:
     def load_data(self):
         """
         Load the data from the input CSV file.
+
+        Binary files written by the ETL scripts (.npy, .parquet, .feather) are loaded directly.
         
         Returns:
         - data (pd.DataFrame): DataFrame containing the loaded data.
         """
+        if os.path.splitext(self.input_file)[1].lower() in ('.npy', '.parquet', '.feather'):
+            # Imported only for binary files, so CSV input does not need the ETL package on the path
+            from ETL.sensorMatrixFile import readSensorMatrix
+            # The imputation writes into the DataFrame, so the file is read into memory instead of memory mapped
+            return readSensorMatrix(self.input_file, mmap=False)
         data = pd.read_csv(self.input_file)
         return data
         
@@ -1,6 +1,30 @@
 import pandas as pd
 import numpy as np
 
+# comparison operators of the conditions and the numpy ufuncs evaluating them (the notebooks import this module
+# from the notebooks folder, so it does not depend on the preProcessing package)
+comparisons = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal, '==': np.equal,
+               '!=': np.not_equal}
+
+
+def condition_mask(values, operator, threshold):
+    """
+    Evaluate values <operator> threshold on every cell without eval.
+
+    Parameters:
+    - values (np.ndarray): The values to compare.
+    - operator (str): The comparison operator ('<', '<=', '>', '>=', '==', '!=').
+    - threshold (int/float): The threshold value.
+
+    Returns:
+    - mask (np.ndarray): The boolean mask.
+    """
+    operator = operator.strip()
+    if operator not in comparisons:
+        raise ValueError(f"Unsupported condition {operator}, expected one of {list(comparisons)}")
+    return comparisons[operator](values, float(threshold))
+
+
 class DataProcessor:
     def __init__(self, csv_file, output_file):
         """
@@ -64,8 +88,8 @@ class DataProcessor:
         Returns:
         - df (pandas.DataFrame): The DataFrame with values replaced based on the condition.
         """
-        # Create a mask based on the condition
-        mask = df.iloc[:, 1:].apply(lambda x: eval(f'x {conditional_operator} {condition_value}'))
+        # Create a mask based on the condition, evaluated on all the columns at once
+        mask = condition_mask(df.iloc[:, 1:].to_numpy(dtype=float), conditional_operator, condition_value)
         # Replace values based on the mask
         df.iloc[:, 1:] = np.where(mask, condition_value_replace, df.iloc[:, 1:])
         return df
@@ -82,8 +106,8 @@ class DataProcessor:
         Returns:
         pd.DataFrame: DataFrame with abnormal values replaced by 0.
         """
-        # Create a mask based on the condition
-        mask = df.iloc[:, 1:].apply(lambda x: eval(f'x {operator} {thres_value}'))
+        # Create a mask based on the condition, evaluated on all the columns at once
+        mask = condition_mask(df.iloc[:, 1:].to_numpy(dtype=float), operator, thres_value)
         # Replace values based on the mask
         df.iloc[:, 1:] = np.where(mask,0, df.iloc[:, 1:])
         return df
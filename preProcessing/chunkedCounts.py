@@ -0,0 +1,174 @@
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from preProcessing.predicate import parse
+except ImportError:
+    # imported from the preProcessing folder (e.g. by the notebooks)
+    from predicate import parse
+
+# number of rows read at a time by default
+default_chunk_size = 100000
+
+# number of bytes sampled after the header to estimate the size of a CSV row
+sample_bytes = 1 << 16
+
+
+def csv_chunks(file_path, chunk_size=default_chunk_size):
+    """
+    Split the rows of a CSV file into byte ranges of about chunk_size rows, aligned on line starts.
+
+    Only the header and a small sample are read, the ranges are found by seeking in the file.
+
+    Args:
+    - file_path (str): The path to the CSV file.
+    - chunk_size (int): The approximate number of rows of a range.
+
+    Returns:
+    - columns (list): The column names of the file.
+    - chunks (list): The (start, stop) byte offsets of the ranges.
+    """
+    columns = list(pd.read_csv(file_path, nrows=0).columns)
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        file.readline()
+        data_start = file.tell()
+        sample = file.read(sample_bytes)
+        row_bytes = len(sample) / max(sample.count(b'\n'), 1)
+        chunk_bytes = max(int(chunk_size * row_bytes), 1)
+
+        chunks = []
+        start = data_start
+        while start < size:
+            file.seek(min(start + chunk_bytes, size) - 1)
+            file.readline()
+            # Move the end of the range to the end of the line it falls in
+
+            stop = min(file.tell(), size)
+            chunks.append((start, stop))
+            start = stop
+    return columns, chunks
+
+
+def matrix_chunks(rows, chunk_size=default_chunk_size):
+    """
+    Split the rows of a matrix into (start, stop) ranges of chunk_size rows.
+    """
+    return [(start, min(start + chunk_size, rows)) for start in range(0, rows, chunk_size)]
+
+
+def count_csv_chunk(file_path, start, stop, columns, column_number, predicate):
+    """
+    Count the rows of a byte range of a CSV file satisfying the predicate, in the columns starting from column_number.
+
+    Only the selected columns of the range are parsed.
+
+    Returns:
+    - counts (np.ndarray): The counts for each selected column.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(stop - start)
+    try:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=range(column_number, len(columns)))
+    except pd.errors.EmptyDataError:
+        return np.zeros(len(columns) - column_number, dtype=np.int64)
+        # The range only holds blank lines
+    return predicate.count(df.to_numpy(dtype=np.float64))
+
+
+def count_matrix_chunk(file_path, start, stop, column_offset, predicate):
+    """
+    Count the rows start:stop of a memory mapped .npy matrix satisfying the predicate, in the columns starting
+    from column_offset.
+
+    Returns:
+    - counts (np.ndarray): The counts for each selected column.
+    """
+    matrix = np.load(file_path, mmap_mode='r')
+    return predicate.count(np.asarray(matrix[start:stop, column_offset:], dtype=np.float64))
+    # Compare in float64 like the in-memory analysis (float32 files are converted block by block)
+
+
+def count_chunks(function, tasks, columns, workers=None):
+    """
+    Run the chunk counting function on every task and add the partial counts.
+
+    Args:
+    - function: count_csv_chunk or count_matrix_chunk.
+    - tasks (list): The argument tuples of the function, one per chunk.
+    - columns (int): The number of counted columns.
+    - workers (int): The number of worker processes, the chunks are counted in this process if None.
+
+    Returns:
+    - counts (np.ndarray): The counts for each column.
+    """
+    counts = np.zeros(columns, dtype=np.int64)
+    if workers is None:
+        for task in tasks:
+            counts += function(*task)
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(function, *zip(*tasks)):
+            counts += partial
+            # Only the small argument tuples and partial counts move between the processes, every worker reads its own chunk
+    return counts
+
+
+def count_file(file_path, condition, threshold, column_number, chunk_size=default_chunk_size, workers=None,
+               matrix_file=None, numeric_start=None, columns=None):
+    """
+    Count the rows satisfying the condition in the columns starting from column_number, reading the file in chunks.
+
+    The peak memory depends on chunk_size (and workers) and not on the size of the file.
+
+    Args:
+    - file_path (str): The data file (.csv, or .npy sensor matrix written by the ETL scripts).
+    - condition (str): The condition to evaluate (e.g., '>', '<=', '==').
+    - threshold (int/float): The threshold value.
+    - column_number (int): The starting column number.
+    - chunk_size (int): The number of rows read at a time.
+    - workers (int): The number of worker processes (None counts in this process).
+    - matrix_file (str): Optional .npy matrix holding the columns starting from numeric_start (e.g. the DataAnalyzer disk cache), read instead of the file.
+    - numeric_start (int): The column number of the first column of matrix_file.
+    - columns (list): The column names of the file, read from its header if None.
+
+    Returns:
+    - selected_columns (list): The selected column names.
+    - counts (np.ndarray): The counts for each selected column.
+    """
+    predicate = parse(condition, threshold)
+
+    if matrix_file is None and os.path.splitext(file_path)[1].lower() == '.npy':
+        from ETL.sensorMatrixFile import sidecarFiles
+        # Imported only for binary files, so CSV analysis does not need the ETL package on the path
+
+        with open(sidecarFiles(file_path)[1]) as file:
+            stations = json.load(file)
+        columns = ['Unnamed: 0', 'TimeStamp'] + stations
+        # Same columns as read_csv of the file: row number, TimeStamp and one column per station
+
+        matrix_file, numeric_start = file_path, 2
+
+    if matrix_file is not None:
+        if column_number < numeric_start:
+            raise ValueError(f"Column {column_number} is not a numeric column of {matrix_file}")
+        if columns is None:
+            columns = list(pd.read_csv(file_path, nrows=0).columns)
+        rows = np.load(matrix_file, mmap_mode='r').shape[0]
+        tasks = [(matrix_file, start, stop, column_number - numeric_start, predicate)
+                 for start, stop in matrix_chunks(rows, chunk_size)]
+        return columns[column_number:], count_chunks(count_matrix_chunk, tasks, len(columns) - column_number, workers)
+
+    if os.path.splitext(file_path)[1].lower() in ('.parquet', '.feather'):
+        raise ValueError(f"Chunked counting supports .csv and .npy files, not {file_path}")
+
+    columns, chunks = csv_chunks(file_path, chunk_size)
+    tasks = [(file_path, start, stop, columns, column_number, predicate) for start, stop in chunks]
+    return columns[column_number:], count_chunks(count_csv_chunk, tasks, len(columns) - column_number, workers)
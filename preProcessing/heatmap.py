@@ -19,6 +19,13 @@ The plotly.graph_objects module from the plotly library provides a high-level in
 It allows you to create a wide range of charts, maps, and other visualizations with customizable features.
 """
 
+import os
+"""
+The os module provides functions for interacting with the operating system.
+
+It is used here to inspect file paths, such as the extension of the data file.
+"""
+
 import re
 """
 The re module provides regular expression matching operations for pattern searching and manipulation of strings.
@@ -26,26 +33,229 @@ The re module provides regular expression matching operations for pattern search
 It is commonly used for tasks such as string parsing, pattern matching, and text manipulation.
 """
 
+import json
+"""
+The json module encodes and decodes JSON documents.
+
+It is used here to store the column names and coordinates of the on-disk dataset cache.
+"""
+
+import hashlib
+"""
+The hashlib module provides secure hash functions.
+
+It is used here to tell apart the on-disk cache files of equally named data files of different directories.
+"""
+
+from collections import OrderedDict
+"""
+The OrderedDict class is a dictionary that remembers the order in which its keys were used.
+
+It is used here as the least recently used cache of parsed datasets.
+"""
+
+try:
+    from preProcessing.chunkedCounts import count_file, default_chunk_size
+    from preProcessing.predicate import parse
+    from preProcessing.thresholdIndex import ThresholdIndex
+    from preProcessing.timeWindowIndex import TimeWindowIndex
+except ImportError:
+    from chunkedCounts import count_file, default_chunk_size
+    from predicate import parse
+    from thresholdIndex import ThresholdIndex
+    from timeWindowIndex import TimeWindowIndex
+"""
+The parse function compiles conditions into numpy ufunc calls, the ThresholdIndex class answers threshold count queries from sorted columns, the TimeWindowIndex class answers count queries over time windows and count_file counts the rows of a file chunk by chunk.
+
+They are imported from the preProcessing package, or from the same folder when this module is imported directly (e.g. by the notebooks).
+"""
+
+dataset_cache = OrderedDict()
+# Parsed datasets shared by all DataAnalyzer instances, keyed by (absolute path, size, modification time)
+
+cache_size = 4
+# Maximum number of datasets kept in memory, the least recently used dataset is dropped first
+
+
+def clear_cache():
+    """
+    Drop all the parsed datasets kept in memory.
+    """
+    dataset_cache.clear()
+
+
 class DataAnalyzer:
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache_dir=None):
         """
         Initialize an instance of the data analysis class.
 
         Args:
         - file_path (str): The path to the CSV file. This is a string representing the file path to the CSV file that will be analyzed.
+        - cache_dir (str): Optional directory of the on-disk dataset cache. Later processes load the parsed matrix from it (.npy and .json files) instead of parsing the CSV file again.
         """
         self.file_path = file_path  # Store the file path as an instance variable
+        self.cache_dir = cache_dir  # Store the directory of the on-disk cache (None disables it)
         self.condition = None  # Initialize the condition attribute to None
         self.threshold = None  # Initialize the threshold attribute to None
         self.df_coordinates = None  # Initialize the df_coordinates attribute to None
 
+    def cache_key(self):
+        """
+        Return the key identifying the current content of the data file.
+
+        Returns:
+        - key (tuple): The absolute path, size and modification time (ns) of the file. A rewritten file gets a new key.
+        """
+        stat = os.stat(self.file_path)
+        # Read the size and modification time of the file
+
+        return (os.path.abspath(self.file_path), stat.st_size, stat.st_mtime_ns)
+
+    def cache_files(self, key):
+        """
+        Return the paths of the on-disk cache files of a dataset.
+
+        Args:
+        - key (tuple): The key returned by cache_key.
+
+        Returns:
+        - matrix_file, meta_file (str): The .npy file holding the numeric matrix and the .json file holding the columns and coordinates.
+        """
+        path_hash = hashlib.sha256(key[0].encode()).hexdigest()[:16]
+        root = os.path.join(self.cache_dir, f"{os.path.basename(key[0])}.{path_hash}.{key[1]}.{key[2]}")
+        # The hash of the absolute path, the size and the modification time are part of the name, so cache files of
+        # other files with the same name and stale cache files are never read
+
+        return root + '.npy', root + '.json'
+
+    def build_dataset(self, df):
+        """
+        Build the cached form of a DataFrame: its column names, its numeric matrix and its coordinates.
+
+        Args:
+        - df (pd.DataFrame): The DataFrame read by read_csv.
+
+        Returns:
+        - dataset (dict): The columns (list), numeric_start (index of the first column of the numeric matrix), values (np.ndarray) and coordinates (list of (column index, latitude, longitude)).
+        """
+        numeric = [pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]
+        numeric_start = len(numeric)
+        while numeric_start > 0 and numeric[numeric_start - 1]:
+            numeric_start -= 1
+        # The numeric matrix is made of the trailing numeric columns (the sensor columns after the TimeStamp column)
+
+        return {'columns': list(df.columns), 'numeric_start': numeric_start,
+                'values': df.iloc[:, numeric_start:].to_numpy(dtype=np.float64),
+                'coordinates': self.parse_coordinates(df.columns)}
+
+    def parse_coordinates(self, columns):
+        """
+        Parse the coordinates of the stations from the column names.
+
+        Args:
+        - columns (list): The column names, the station columns contain "(longitude latitude)".
+
+        Returns:
+        - coordinates (list): The (column index, latitude, longitude) of every station column (starting from the second column).
+        """
+        coordinates = []
+        for index, column_name in enumerate(columns):
+            matches = re.findall(r'\((.*?)\)', str(column_name))
+            # Find the "(longitude latitude)" part of the column name
+
+            if index > 0 and len(matches) > 0:
+                longitude, latitude = map(float, matches[0].split())
+                coordinates.append((index, latitude, longitude))
+
+        return coordinates
+
+    def load_dataset(self):
+        """
+        Return the parsed dataset of the data file, from the in-memory cache, the on-disk cache or by reading the file.
+
+        Returns:
+        - dataset (dict): The cached dataset, see build_dataset.
+        """
+        key = self.cache_key()
+        if key in dataset_cache:
+            dataset_cache.move_to_end(key)
+            # Mark the dataset as the most recently used one
+
+            return dataset_cache[key]
+
+        dataset = None
+        if self.cache_dir is not None:
+            matrix_file, meta_file = self.cache_files(key)
+            if os.path.isfile(matrix_file) and os.path.isfile(meta_file):
+                with open(meta_file) as file:
+                    dataset = json.load(file)
+                dataset['coordinates'] = [tuple(coordinate) for coordinate in dataset['coordinates']]
+                dataset['values'] = np.load(matrix_file, mmap_mode='r')
+                # Load the numeric matrix memory mapped, without parsing the CSV file
+
+        if dataset is None:
+            dataset = self.build_dataset(self.read_csv())
+            # Parse the file once
+
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                matrix_file, meta_file = self.cache_files(key)
+                temp_suffix = f".{os.getpid()}.tmp"
+                with open(matrix_file + temp_suffix, 'wb') as file:
+                    np.save(file, dataset['values'])
+                os.replace(matrix_file + temp_suffix, matrix_file)
+                with open(meta_file + temp_suffix, 'w') as file:
+                    json.dump({'columns': [str(column) for column in dataset['columns']],
+                               'numeric_start': dataset['numeric_start'], 'coordinates': dataset['coordinates']}, file)
+                os.replace(meta_file + temp_suffix, meta_file)
+                # Store the numeric matrix and the column names for later processes, each file is written to a
+                # temporary file and renamed, so a concurrent process never reads a partial file
+
+        dataset_cache[key] = dataset
+        while len(dataset_cache) > cache_size:
+            dataset_cache.popitem(last=False)
+            # Drop the least recently used datasets
+
+        return dataset
+
+    def get_data(self, column_number):
+        """
+        Return the columns starting from the specified column number and their values, from the dataset cache.
+
+        Args:
+        - column_number (int): The starting column number.
+
+        Returns:
+        - selected_columns (list): The selected column names.
+        - data (np.ndarray): The values of the selected columns.
+        """
+        dataset = self.load_dataset()
+        if column_number >= dataset['numeric_start']:
+            return dataset['columns'][column_number:], dataset['values'][:, column_number - dataset['numeric_start']:]
+            # Slice the cached numeric matrix, no copy is made
+
+        df = self.read_csv()
+        selected_columns = self.select_columns(df, column_number)
+        return selected_columns, self.convert_to_numpy(df, selected_columns)
+        # Selections including non numeric columns are not cached
+
     def read_csv(self):
         """
         Read the CSV file and return a pandas DataFrame.
 
+        Binary files written by the ETL scripts (.npy, .parquet, .feather) are loaded directly and memory mapped,
+        with the same column layout as the CSV file.
+
         Returns:
         - df (pd.DataFrame): The pandas DataFrame containing the data from the CSV file.
         """
+        if os.path.splitext(self.file_path)[1].lower() in ('.npy', '.parquet', '.feather'):
+            from ETL.sensorMatrixFile import readSensorMatrix
+            # Imported only for binary files, so CSV analysis does not need the ETL package on the path
+
+            return readSensorMatrix(self.file_path, mmap=True)
+            # Load the binary file without parsing text, the values stay memory mapped
+
         df = pd.read_csv(self.file_path)
         # Read the CSV file into a pandas DataFrame
 
@@ -95,11 +305,11 @@ class DataAnalyzer:
         Returns:
         - counts (np.ndarray): The counts for each column that satisfy the condition. This is a numpy array containing the counts for each column that satisfies the given condition and threshold.
         """
-        condition_met = eval(f"data {condition} {threshold}")
-        # Evaluate the condition using the data array, condition, and threshold
-        
-        counts = np.sum(condition_met, axis=0)
-        # Sum the rows that satisfy the condition along the specified axis (0 represents columns)
+        predicate = parse(condition, threshold)
+        # Compile the condition and threshold into a numpy comparison (only the operators '<', '<=', '>', '>=', '==', '!=' are accepted)
+
+        counts = predicate.count(data)
+        # Count the rows that satisfy the condition for each column, evaluating the data in cache-sized row blocks
 
         return counts
 
@@ -118,7 +328,155 @@ class DataAnalyzer:
         # Create a hashmap by zipping the selected_columns list and the counts array
         return hashmap
 
-    def analyze_data(self, condition, threshold, column_number):
+    def get_threshold_index(self, column_number):
+        """
+        Return the threshold index of the columns starting from the specified column number, building it on first use.
+
+        The index is kept with the cached dataset, so it is shared by all the instances analyzing the same file.
+
+        Args:
+        - column_number (int): The starting column number.
+
+        Returns:
+        - index (ThresholdIndex): The index of the selected columns.
+        """
+        indexes = self.load_dataset().setdefault('indexes', {})
+        if column_number not in indexes:
+            selected_columns, data = self.get_data(column_number)
+            indexes[column_number] = ThresholdIndex(data, selected_columns)
+            # Sort every column once, later queries only run binary searches
+
+        return indexes[column_number]
+
+    def analyze_thresholds(self, queries, column_number):
+        """
+        Analyze the data for several conditions and thresholds at once, using the threshold index.
+
+        Args:
+        - queries (list): The (condition, threshold) pairs (e.g., [('>', 15), ('>', 35), ('<=', 50)]).
+        - column_number (int): The starting column number.
+
+        Returns:
+        - hashmaps (dict): The hashmap mapping column names to counts of every (condition, threshold) pair.
+        """
+        return self.get_threshold_index(column_number).hashmaps(queries)
+
+    def get_timestamps(self):
+        """
+        Return the timestamps of the rows of the data file (TimeStamp column), reading them on first use.
+
+        Returns:
+        - timestamps (np.ndarray): The datetime64 timestamps of the rows.
+        """
+        dataset = self.load_dataset()
+        if 'timestamps' not in dataset:
+            if os.path.splitext(self.file_path)[1].lower() in ('.npy', '.parquet', '.feather'):
+                timestamps = self.read_csv()['TimeStamp']
+                # Binary files are memory mapped, the other columns are not read
+            else:
+                timestamps = pd.read_csv(self.file_path, usecols=['TimeStamp'])['TimeStamp']
+                # Only parse the TimeStamp column of the CSV file
+
+            dataset['timestamps'] = pd.to_datetime(timestamps).to_numpy(dtype='datetime64[ns]')
+            # Keep the timestamps with the cached dataset
+
+        return dataset['timestamps']
+
+    def get_time_index(self, queries, column_number):
+        """
+        Return the time window index of the columns starting from the specified column number for the given queries, building it on first use.
+
+        The index is kept with the cached dataset, so it is shared by all the instances analyzing the same file.
+
+        Args:
+        - queries (list): The (condition, threshold) pairs to index (e.g., [('>', 35)]).
+        - column_number (int): The starting column number.
+
+        Returns:
+        - index (TimeWindowIndex): The index of the selected columns.
+        """
+        indexes = self.load_dataset().setdefault('time_indexes', {})
+        for (index_column, _), index in indexes.items():
+            if index_column == column_number and all((condition, float(threshold)) in index.queries for condition, threshold in queries):
+                return index
+                # An index built for more queries answers these ones as well
+
+        selected_columns, data = self.get_data(column_number)
+        index = TimeWindowIndex(data, self.get_timestamps(), queries, selected_columns)
+        # Compute the cumulative counts once, later windows only take two lookups
+
+        indexes[(column_number, tuple(queries))] = index
+        return index
+
+    def analyze_window(self, condition, threshold, column_number, start=None, end=None):
+        """
+        Analyze the data between two dates, using the time window index.
+
+        Args:
+        - condition (str): The condition to evaluate (e.g., '>', '<=', '==').
+        - threshold (int/float): The threshold value.
+        - column_number (int): The starting column number.
+        - start (str/datetime): The first timestamp of the window (None for the beginning of the data).
+        - end (str/datetime): The end of the window, excluded (None for the end of the data).
+
+        Returns:
+        - hashmap (dict): A hashmap mapping column names to counts.
+        """
+        self.condition = condition  # Set the condition attribute of the instance
+        self.threshold = threshold  # Set the threshold attribute of the instance
+
+        return self.get_time_index([(condition, threshold)], column_number).hashmap(condition, threshold, start, end)
+
+    def analyze_periods(self, condition, threshold, column_number, by='month'):
+        """
+        Count the rows satisfying the condition for every day, month or season, using the time window index.
+
+        Args:
+        - condition (str): The condition to evaluate (e.g., '>', '<=', '=='), None counts the valid (non NaN) values.
+        - threshold (int/float): The threshold value.
+        - column_number (int): The starting column number.
+        - by (str): 'day', 'month' or 'season'.
+
+        Returns:
+        - counts (pd.DataFrame): The counts, one row per period and one column per selected column.
+        """
+        queries = [(condition, threshold)] if condition is not None else []
+        return self.get_time_index(queries, column_number).grouped(by, condition, threshold)
+
+    def count_chunked(self, condition, threshold, column_number, chunk_size=None, workers=None):
+        """
+        Count the rows satisfying the condition without loading the whole file, reading it in chunks of rows.
+
+        CSV files are split into byte ranges, .npy files (and the on-disk dataset cache, when it exists) are read
+        memory mapped. The memory used depends on the chunk size and not on the size of the file.
+
+        Args:
+        - condition (str): The condition to evaluate (e.g., '>', '<=', '==').
+        - threshold (int/float): The threshold value.
+        - column_number (int): The starting column number.
+        - chunk_size (int): The number of rows read at a time (default_chunk_size if None).
+        - workers (int): The number of processes counting the chunks, the partial counts are added (None counts in this process).
+
+        Returns:
+        - selected_columns (list): The selected column names.
+        - counts (np.ndarray): The counts for each selected column.
+        """
+        chunk_size = chunk_size or default_chunk_size
+        # Use the default chunk size if none is given
+
+        if self.cache_dir is not None:
+            matrix_file, meta_file = self.cache_files(self.cache_key())
+            if os.path.isfile(matrix_file) and os.path.isfile(meta_file):
+                with open(meta_file) as file:
+                    meta = json.load(file)
+                if column_number >= meta['numeric_start']:
+                    return count_file(self.file_path, condition, threshold, column_number, chunk_size, workers,
+                                      matrix_file, meta['numeric_start'], meta['columns'])
+                    # Read the parsed matrix of the on-disk cache instead of the CSV file
+
+        return count_file(self.file_path, condition, threshold, column_number, chunk_size, workers)
+
+    def analyze_data(self, condition, threshold, column_number, use_index=False, chunk_size=None, workers=None):
         """
         Analyze the data by counting the number of rows that satisfy the given condition and threshold.
 
@@ -126,6 +484,9 @@ class DataAnalyzer:
         - condition (str): The condition to evaluate (e.g., '>', '<=', '==').
         - threshold (int/float): The threshold value.
         - column_number (int): The starting column number.
+        - use_index (bool): Count with the threshold index (sorted once, faster for repeated queries) instead of comparing every value.
+        - chunk_size (int): Read the file in chunks of chunk_size rows instead of loading it, for files larger than the memory.
+        - workers (int): The number of processes counting the chunks (only with chunk_size).
 
         Returns:
         - hashmap (dict): A hashmap mapping column names to counts.
@@ -133,13 +494,16 @@ class DataAnalyzer:
         self.condition = condition  # Set the condition attribute of the instance
         self.threshold = threshold  # Set the threshold attribute of the instance
 
-        df = self.read_csv() # Read the CSV file
-        
-        selected_columns = self.select_columns(df, column_number)
-        # Select the columns to analyze
-        
-        data = self.convert_to_numpy(df, selected_columns)
-        # Convert the selected columns to a numpy array
+        if chunk_size is not None:
+            return self.create_hashmap(*self.count_chunked(condition, threshold, column_number, chunk_size, workers))
+            # Stream the file, only the counts of every column are kept in memory
+
+        if use_index:
+            return self.analyze_thresholds([(condition, threshold)], column_number)[(condition, threshold)]
+            # Answer the query from the sorted columns
+
+        selected_columns, data = self.get_data(column_number)
+        # Select the columns to analyze as a numpy array, parsing the file only if it is not cached
         
         counts = self.count_rows_satisfying_condition(data, condition, threshold)
         # Count the rows satisfying the condition
@@ -149,7 +513,7 @@ class DataAnalyzer:
 
         return hashmap
 
-    def extract_coordinates(self, condition, threshold, column_number):
+    def extract_coordinates(self, condition, threshold, column_number, chunk_size=None, workers=None, start=None, end=None):
         """
         Extract the latitude, longitude, and count from the data.
 
@@ -157,35 +521,47 @@ class DataAnalyzer:
         - condition (str): The condition to evaluate (e.g., '>', '<=', '==').
         - threshold (int/float): The threshold value.
         - column_number (int): The starting column number.
+        - chunk_size (int): Read the file in chunks of chunk_size rows instead of loading it, for files larger than the memory.
+        - workers (int): The number of processes counting the chunks (only with chunk_size).
+        - start, end (str/datetime): Only count the rows of this time window (end excluded), using the time window index.
 
         Returns:
         - df_coordinates (pd.DataFrame): The DataFrame containing latitude, longitude, and count.
         """
         self.condition = condition  # Set the condition attribute of the instance
         self.threshold = threshold  # Set the threshold attribute of the instance
-        df = self.read_csv()  # Read the CSV file into a pandas DataFrame
+
+        if chunk_size is not None and (start is not None or end is not None):
+            raise ValueError("Time windows are counted with the time window index, they cannot be combined with chunk_size")
+
+        if chunk_size is not None:
+            selected_columns, counts = self.count_chunked(condition, threshold, column_number, chunk_size, workers)
+            # Count the rows chunk by chunk, the dataset is not loaded
+
+            coordinates = self.parse_coordinates([None] * column_number + list(selected_columns))
+            # Only the names of the counted columns are needed to parse the coordinates, at their column index
+        else:
+            coordinates = self.load_dataset()['coordinates']
+            # Load the parsed dataset, parsing the file only if it is not cached
 
         data = {'latitude': [], 'longitude': [], 'count': []}
         # Initialize empty lists to store latitude, longitude, and count values
 
-        for column_name in df.columns[1:]:
-            # Iterate over the column names in the DataFrame, starting from the second column. This assumes that the first column does not contain coordinate data.
-
-            matches = re.findall(r'\((.*?)\)', column_name)
-            # Use a regular expression pattern to find all occurrences of latitude and longitude values enclosed in parentheses in the column name.
-    
-            if len(matches) > 0:
-                longitude, latitude = map(float, matches[0].split())
-                # Extract the latitude and longitude values from the matches list by splitting the string and converting them to float.
+        for index, latitude, longitude in coordinates:
+            # The coordinates were parsed from the column names (starting from the second column) when the dataset was loaded
 
-                data['latitude'].append(latitude)  # Append the latitude value to the latitude list
-                data['longitude'].append(longitude)  # Append the longitude value to the longitude list
+            data['latitude'].append(latitude)  # Append the latitude value to the latitude list
+            data['longitude'].append(longitude)  # Append the longitude value to the longitude list
 
-        data_array = self.convert_to_numpy(df, df.columns[column_number:])
-        # Convert the selected columns from the DataFrame into a NumPy array using the convert_to_numpy method.
+        if chunk_size is None and (start is not None or end is not None):
+            counts = self.get_time_index([(condition, threshold)], column_number).count(condition, threshold, start, end)
+            # Count the rows of the time window from the cumulative counts
+        elif chunk_size is None:
+            selected_columns, data_array = self.get_data(column_number)
+            # Select the columns from the cached dataset as a NumPy array.
 
-        counts = self.count_rows_satisfying_condition(data_array, self.condition, self.threshold)
-        # Count the number of rows in the data array that satisfy the specified condition and threshold using the count_rows_satisfying_condition method.
+            counts = self.count_rows_satisfying_condition(data_array, self.condition, self.threshold)
+            # Count the number of rows in the data array that satisfy the specified condition and threshold using the count_rows_satisfying_condition method.
 
         data['count'] = counts.tolist()
         # Convert the count values to a list and assign them to the 'count' key in the data dictionary.
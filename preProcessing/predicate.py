@@ -0,0 +1,207 @@
+import numpy as np
+
+# comparison operators and the ufuncs evaluating them
+comparisons = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal, '==': np.equal,
+               '!=': np.not_equal}
+
+# number of matrix cells evaluated at a time, so that the block and its buffers stay in the CPU cache
+block_cells = 1 << 16
+
+
+class Predicate:
+    """
+    Condition on a matrix (or on several parameter matrices of the same shape, given as a dictionary), compiled
+    once into ufunc calls and evaluated in row blocks with preallocated buffers. Predicates are combined with
+    & (and), | (or) and ~ (not).
+    """
+
+    depth = 0
+    # Number of scratch buffers needed to evaluate the predicate
+
+    def evaluate_block(self, block, out, buffers):
+        raise NotImplementedError
+
+    def shape(self, data):
+        if isinstance(data, dict):
+            shapes = {np.shape(values) for values in data.values()}
+            if len(shapes) != 1:
+                raise ValueError(f"The parameters have different shapes {shapes}")
+            return shapes.pop()
+        return np.shape(data)
+
+    def blocks(self, data):
+        """
+        Yield (start, stop, block) for the row blocks of the data, together with the scratch buffers of the predicate.
+        """
+        shape = self.shape(data)
+        row_cells = int(np.prod(shape[1:], dtype=np.int64)) if len(shape) > 1 else 1
+        block_rows = max(1, block_cells // max(row_cells, 1))
+        buffers = [np.empty((block_rows,) + tuple(shape[1:]), dtype=bool) for _ in range(self.depth)]
+        for start in range(0, shape[0], block_rows):
+            stop = min(start + block_rows, shape[0])
+            if isinstance(data, dict):
+                block = {parameter: values[start:stop] for parameter, values in data.items()}
+            else:
+                block = data[start:stop]
+            yield start, stop, block, [buffer[:stop - start] for buffer in buffers]
+
+    def mask(self, data, out=None):
+        """
+        Evaluate the predicate on every cell.
+
+        Args:
+        - data (np.ndarray or dict): The matrix, or the parameter matrices when the predicate names parameters.
+        - out (np.ndarray): Optional boolean array receiving the mask.
+
+        Returns:
+        - mask (np.ndarray): The boolean mask.
+        """
+        if out is None:
+            out = np.empty(self.shape(data), dtype=bool)
+        for start, stop, block, buffers in self.blocks(data):
+            self.evaluate_block(block, out[start:stop], buffers)
+        return out
+
+    def count(self, data):
+        """
+        Count the rows satisfying the predicate in every column, without materializing the full mask.
+
+        Returns:
+        - counts (np.ndarray): The counts for each column.
+        """
+        shape = self.shape(data)
+        counts = np.zeros(shape[1:], dtype=np.int64)
+        out = None
+        for start, stop, block, buffers in self.blocks(data):
+            if out is None or len(out) < stop - start:
+                out = np.empty((stop - start,) + tuple(shape[1:]), dtype=bool)
+            self.evaluate_block(block, out[:stop - start], buffers)
+            counts += np.count_nonzero(out[:stop - start], axis=0)
+        return counts
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Comparison(Predicate):
+    def __init__(self, condition, threshold, parameter=None, nan=None):
+        """
+        Comparison of the values with a threshold.
+
+        Args:
+        - condition (str): The comparison operator ('<', '<=', '>', '>=', '==', '!=').
+        - threshold (int/float/str): The threshold value.
+        - parameter (str): The parameter compared, when the data is a dictionary of parameter matrices.
+        - nan (bool): The result for NaN values. None keeps the IEEE semantics of numpy (NaN only satisfies !=).
+        """
+        if condition not in comparisons:
+            raise ValueError(f"Unsupported condition {condition}, expected one of {list(comparisons)}")
+        self.condition = condition
+        self.ufunc = comparisons[condition]
+        self.threshold = float(threshold)
+        self.parameter = parameter
+        self.nan = nan
+        self.depth = 0 if nan is None else 1
+
+    def evaluate_block(self, block, out, buffers):
+        values = block[self.parameter] if self.parameter is not None else block
+        self.ufunc(values, self.threshold, out=out)
+        if self.nan is not None:
+            np.isnan(values, out=buffers[0])
+            out[buffers[0]] = self.nan
+
+    def __repr__(self):
+        return f"{self.parameter or 'x'} {self.condition} {self.threshold}"
+
+
+class Between(Predicate):
+    def __init__(self, low, high, parameter=None, inclusive=True, nan=None):
+        """
+        Range condition low <= x <= high (low < x < high if not inclusive).
+        """
+        condition = ('>=', '<=') if inclusive else ('>', '<')
+        self.predicate = And(Comparison(condition[0], low, parameter, nan), Comparison(condition[1], high, parameter, nan))
+        self.depth = self.predicate.depth
+
+    def evaluate_block(self, block, out, buffers):
+        self.predicate.evaluate_block(block, out, buffers)
+
+    def __repr__(self):
+        return repr(self.predicate)
+
+
+class And(Predicate):
+    combine = staticmethod(np.logical_and)
+    symbol = '&'
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+        self.depth = 1 + max(predicate.depth for predicate in predicates)
+
+    def evaluate_block(self, block, out, buffers):
+        self.predicates[0].evaluate_block(block, out, buffers[1:])
+        for predicate in self.predicates[1:]:
+            predicate.evaluate_block(block, buffers[0], buffers[1:])
+            self.combine(out, buffers[0], out=out)
+
+    def __repr__(self):
+        return '(' + f' {self.symbol} '.join(repr(predicate) for predicate in self.predicates) + ')'
+
+
+class Or(And):
+    combine = staticmethod(np.logical_or)
+    symbol = '|'
+
+
+class Not(Predicate):
+    def __init__(self, predicate):
+        self.predicate = predicate
+        self.depth = predicate.depth
+
+    def evaluate_block(self, block, out, buffers):
+        self.predicate.evaluate_block(block, out, buffers)
+        np.logical_not(out, out=out)
+
+    def __repr__(self):
+        return '~' + repr(self.predicate)
+
+
+def parse(condition, threshold=None, parameter=None, nan=None):
+    """
+    Build a predicate from a condition specification.
+
+    Args:
+    - condition: An operator ('>') used with threshold, a string such as '> 35' or '10 <= x < 35', a (condition, threshold)
+      pair, a list of specifications (combined with and), a dictionary {parameter: specification} or a Predicate.
+    - threshold (int/float): The threshold, when condition is an operator.
+    - parameter (str): The parameter of the comparisons.
+    - nan (bool): The result for NaN values (None keeps the numpy semantics).
+
+    Returns:
+    - predicate (Predicate): The compiled predicate.
+    """
+    if isinstance(condition, Predicate):
+        return condition
+    if isinstance(condition, dict):
+        return And(*[parse(specification, parameter=name, nan=nan) for name, specification in condition.items()])
+    if isinstance(condition, tuple):
+        return Comparison(condition[0], condition[1], parameter, nan)
+    if isinstance(condition, list):
+        return And(*[parse(specification, parameter=parameter, nan=nan) for specification in condition])
+    if threshold is not None:
+        return Comparison(condition.strip(), threshold, parameter, nan)
+
+    tokens = condition.split()
+    if len(tokens) == 2:
+        return Comparison(tokens[0], tokens[1], parameter, nan)
+    if len(tokens) == 5 and tokens[1] in ('<', '<=') and tokens[3] in ('<', '<='):
+        # low <= x < high
+        return And(Comparison('>' if tokens[1] == '<' else '>=', tokens[0], parameter, nan),
+                   Comparison(tokens[3], tokens[4], parameter, nan))
+    raise ValueError(f"Unsupported condition {condition}")
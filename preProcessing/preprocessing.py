@@ -1,5 +1,11 @@
+import os
 import pandas as pd
 import numpy as np
+try:
+    from preProcessing.predicate import parse
+except ImportError:
+    # imported from the preProcessing folder (e.g. by the notebooks)
+    from predicate import parse
 
 class DataProcessor:
     def __init__(self, csv_file, output_file):
@@ -17,9 +23,16 @@ class DataProcessor:
         """
         Read the CSV file into a DataFrame
         
+        Binary files written by the ETL scripts (.npy, .parquet, .feather) are loaded directly
+        
         Returns:
         DataFrame: The DataFrame containing the data from the CSV file
         """
+        if os.path.splitext(self.csv_file)[1].lower() in ('.npy', '.parquet', '.feather'):
+            # imported only for binary files, so CSV processing does not need the ETL package on the path
+            from ETL.sensorMatrixFile import readSensorMatrix
+            # the DataFrame is modified in place, so the file is read into memory instead of memory mapped
+            return readSensorMatrix(self.csv_file, mmap=False)
         df = pd.read_csv(self.csv_file)
         return df
     
@@ -65,7 +78,7 @@ class DataProcessor:
         DataFrame: The DataFrame with values replaced based on the condition
         """
         condition_value = float(condition_value)  # Convert condition_value to float
-        mask = eval(f"df.iloc[:, 1:].astype(float) {conditional_operator} condition_value")
+        mask = parse(conditional_operator, condition_value).mask(df.iloc[:, 1:].to_numpy(dtype=float))
         df.iloc[:, 1:] = np.where(mask, new_value, df.iloc[:, 1:])
         return df
     
@@ -0,0 +1,104 @@
+import numpy as np
+
+# operators supported by the threshold index, as in DataAnalyzer.count_rows_satisfying_condition
+operators = ['<', '<=', '>', '>=', '==', '!=']
+
+
+class ThresholdIndex:
+    def __init__(self, data, columns=None):
+        """
+        Index answering threshold count queries on a time x station matrix without scanning it.
+
+        Every column is sorted once (NaN values are moved to the end and excluded), after which the number of values
+        satisfying a comparison in every column comes from binary searches, which take O(columns * log rows) per query.
+        The counts are the same as numpy comparisons: NaN values never satisfy <, <=, >, >=, == and always satisfy !=.
+        The index holds a sorted copy of the matrix.
+
+        Args:
+        - data (np.ndarray): The rows x columns matrix to index.
+        - columns (list): Optional names of the columns, used as keys of the hashmaps.
+        """
+        self.sorted = np.sort(np.asarray(data, dtype=np.float64), axis=0)  # NaN values are sorted last
+        self.rows = self.sorted.shape[0]
+        self.valid = self.rows - np.isnan(self.sorted).sum(axis=0)  # Number of non NaN values of every column
+        self.columns = list(columns) if columns is not None else list(range(self.sorted.shape[1]))
+
+    def search(self, thresholds, side):
+        """
+        Binary search of the thresholds in all the columns at the same time.
+
+        Args:
+        - thresholds (np.ndarray): The thresholds, shape (k,).
+        - side (str): 'left' counts the values < threshold, 'right' the values <= threshold.
+
+        Returns:
+        - positions (np.ndarray): The number of valid values below every threshold in every column, shape (k, columns).
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)[:, None]
+        low = np.zeros((len(thresholds), len(self.valid)), dtype=np.int64)
+        high = np.broadcast_to(self.valid, low.shape).copy()
+        column_index = np.arange(len(self.valid))
+        while True:
+            active = low < high
+            if not active.any():
+                return low
+            middle = (low + high) // 2
+            values = self.sorted[np.minimum(middle, self.rows - 1), column_index]
+            below = values < thresholds if side == 'left' else values <= thresholds
+            low = np.where(active & below, middle + 1, low)
+            high = np.where(active & ~below, middle, high)
+
+    def counts(self, queries):
+        """
+        Count the values satisfying every (condition, threshold) pair in every column.
+
+        Args:
+        - queries (list): The (condition, threshold) pairs, conditions among '<', '<=', '>', '>=', '==', '!='.
+
+        Returns:
+        - counts (np.ndarray): The counts, shape (len(queries), columns).
+        """
+        for condition, threshold in queries:
+            if condition not in operators:
+                raise ValueError(f"Unsupported condition {condition}, expected one of {operators}")
+        thresholds = np.array([threshold for condition, threshold in queries], dtype=np.float64)
+        searched = np.where(np.isnan(thresholds), 0, thresholds)  # A NaN threshold matches nothing (but != matches all)
+        left = self.search(searched, 'left')
+        right = self.search(searched, 'right')
+
+        counts = np.empty_like(left)
+        for i, (condition, threshold) in enumerate(queries):
+            if condition == '<':
+                counts[i] = left[i]
+            elif condition == '<=':
+                counts[i] = right[i]
+            elif condition == '>':
+                counts[i] = self.valid - right[i]
+            elif condition == '>=':
+                counts[i] = self.valid - left[i]
+            elif condition == '==':
+                counts[i] = right[i] - left[i]
+            else:
+                counts[i] = self.rows - (right[i] - left[i])  # NaN values are different from every threshold
+            if np.isnan(thresholds[i]):
+                counts[i] = self.rows if condition == '!=' else 0
+        return counts
+
+    def count(self, condition, threshold):
+        """
+        Count the values satisfying the condition in every column, like DataAnalyzer.count_rows_satisfying_condition.
+
+        Returns:
+        - counts (np.ndarray): The counts for each column.
+        """
+        return self.counts([(condition, threshold)])[0]
+
+    def hashmaps(self, queries):
+        """
+        Return the hashmap (column name -> count) of every (condition, threshold) pair.
+
+        Returns:
+        - hashmaps (dict): The hashmaps keyed by (condition, threshold).
+        """
+        return {(condition, threshold): dict(zip(self.columns, counts))
+                for (condition, threshold), counts in zip(queries, self.counts(queries))}
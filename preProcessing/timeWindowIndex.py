@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from preProcessing.predicate import block_cells, parse
+except ImportError:
+    # imported from the preProcessing folder (e.g. by the notebooks)
+    from predicate import block_cells, parse
+
+# names of the seasons, starting from the winter (December, January, February)
+season_names = ['DJF', 'MAM', 'JJA', 'SON']
+
+
+class TimeWindowIndex:
+    def __init__(self, data, timestamps, queries, columns=None):
+        """
+        Index answering count queries over any time window of a time x station matrix.
+
+        For every configured (condition, threshold) pair the index holds the cumulative number of rows satisfying the
+        condition in every column, plus the cumulative number of valid (non NaN) rows. The count of a window is the
+        difference of two rows of the cumulative counts, found by binary search of the window bounds in the timestamps,
+        which takes O(columns) per query whatever the length of the window. The index holds len(queries) + 1 integer
+        matrices of the size of the data (uint16 up to 65535 rows, int32 beyond).
+
+        Args:
+        - data (np.ndarray): The rows x columns matrix to index.
+        - timestamps (np.ndarray): The timestamps of the rows (the rows are sorted by time if they are not).
+        - queries (list): The (condition, threshold) pairs to index, conditions among '<', '<=', '>', '>=', '==', '!='.
+        - columns (list): Optional names of the columns, used as keys of the hashmaps.
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        order = np.argsort(timestamps, kind='stable')
+        if np.any(order != np.arange(len(order))):
+            timestamps, data = timestamps[order], np.asarray(data)[order]
+            # Sort the rows by time, so that every window is a contiguous range of rows
+
+        self.timestamps = timestamps
+        self.rows = len(timestamps)
+        self.columns = list(columns) if columns is not None else list(range(np.shape(data)[1]))
+        self.dtype = np.uint16 if self.rows <= np.iinfo(np.uint16).max else np.int32
+        # The cumulative counts never exceed the number of rows
+
+        self.queries = {}
+        self.cumulative = []
+        for condition, threshold in queries:
+            key = (condition, float(threshold))
+            if key not in self.queries:
+                self.queries[key] = len(self.cumulative)
+                self.cumulative.append(self.accumulate(data, parse(condition, threshold)))
+        self.valid = self.accumulate(data, parse('>=', -np.inf))
+        # Every value is >= -inf except NaN, so this counts the valid values
+
+    def accumulate(self, data, predicate):
+        """
+        Return the cumulative counts of the rows satisfying the predicate, evaluated in row blocks.
+
+        Returns:
+        - cumulative (np.ndarray): The (rows + 1) x columns counts, row i holds the counts of the rows before i.
+        """
+        cumulative = np.empty((self.rows + 1, len(self.columns)), dtype=self.dtype)
+        cumulative[0] = 0
+        block_rows = max(1, block_cells // max(len(self.columns), 1))
+        for start in range(0, self.rows, block_rows):
+            stop = min(start + block_rows, self.rows)
+            block = cumulative[start + 1:stop + 1]
+            np.cumsum(predicate.mask(np.asarray(data[start:stop], dtype=np.float64)), axis=0, dtype=self.dtype, out=block)
+            block += cumulative[start]
+        return cumulative
+
+    def bounds(self, start=None, end=None):
+        """
+        Return the rows of the window start <= timestamp < end (None leaves the window open on that side).
+
+        Returns:
+        - first, last (int): The first row of the window and the row after its end.
+        """
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, np.datetime64(pd.Timestamp(start), 'ns'), 'left'))
+        last = self.rows if end is None else int(np.searchsorted(self.timestamps, np.datetime64(pd.Timestamp(end), 'ns'), 'left'))
+        return first, max(first, last)
+
+    def get_cumulative(self, condition=None, threshold=None):
+        """
+        Return the cumulative counts of a configured (condition, threshold) pair, or of the valid values if condition is None.
+        """
+        if condition is None:
+            return self.valid
+        key = (condition, float(threshold))
+        if key not in self.queries:
+            raise KeyError(f"The query {condition} {threshold} is not indexed, the indexed queries are {list(self.queries)}")
+        return self.cumulative[self.queries[key]]
+
+    def count(self, condition=None, threshold=None, start=None, end=None):
+        """
+        Count the rows satisfying the condition in every column between start (included) and end (excluded).
+
+        Args:
+        - condition (str): The condition of a configured query, None counts the valid (non NaN) values.
+        - threshold (int/float): The threshold of the configured query.
+        - start, end (str/datetime): The bounds of the window, None for the first or last timestamp.
+
+        Returns:
+        - counts (np.ndarray): The counts for each column.
+        """
+        cumulative = self.get_cumulative(condition, threshold)
+        first, last = self.bounds(start, end)
+        return cumulative[last].astype(np.int64) - cumulative[first]
+
+    def hashmap(self, condition=None, threshold=None, start=None, end=None):
+        """
+        Return the hashmap (column name -> count) of the window, like DataAnalyzer.analyze_data.
+        """
+        return dict(zip(self.columns, self.count(condition, threshold, start, end)))
+
+    def grouped(self, by='month', condition=None, threshold=None):
+        """
+        Count the rows satisfying the condition in every column for every day, month or season.
+
+        Seasons are DJF, MAM, JJA and SON, a December belongs to the winter of the following year.
+
+        Args:
+        - by (str): 'day', 'month' or 'season'.
+        - condition (str): The condition of a configured query, None counts the valid (non NaN) values.
+        - threshold (int/float): The threshold of the configured query.
+
+        Returns:
+        - counts (pd.DataFrame): The counts, one row per period (labelled 'YYYY-MM-DD', 'YYYY-MM' or 'YYYY-DJF') and one column per column of the data.
+        """
+        cumulative = self.get_cumulative(condition, threshold)
+        if by == 'day':
+            keys = self.timestamps.astype('datetime64[D]').astype(np.int64)
+        elif by in ('month', 'season'):
+            keys = self.timestamps.astype('datetime64[M]').astype(np.int64)
+            if by == 'season':
+                keys = (keys + 1) // 3
+                # Months since 1970-01 shifted by one, so that December starts the next group of three months
+        else:
+            raise ValueError(f"Unsupported grouping {by}, expected 'day', 'month' or 'season'")
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if self.rows else np.array([], dtype=np.int64)
+        ends = np.r_[starts[1:], self.rows][:len(starts)].astype(np.int64)
+        counts = cumulative[ends].astype(np.int64) - cumulative[starts]
+        # The rows are sorted by time, so every period is a contiguous range of rows
+
+        if by == 'day':
+            labels = np.datetime_as_string(keys[starts].astype('datetime64[D]'))
+        elif by == 'month':
+            labels = np.datetime_as_string(keys[starts].astype('datetime64[M]'))
+        else:
+            labels = [f"{1970 + 3 * key // 12}-{season_names[key % 4]}" for key in keys[starts]]
+        return pd.DataFrame(counts, index=labels, columns=self.columns)
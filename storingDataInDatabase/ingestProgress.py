@@ -0,0 +1,110 @@
+import datetime
+import json
+import time
+from contextlib import contextmanager
+
+# phases of the ingestion of a file, in pipeline order
+ingestPhases = ['unzip', 'decode', 'clean', 'load', 'commit']
+
+
+@contextmanager
+def measurePhase(phases, name):
+    """
+    Adds the time spent in the with block to phases[name] (nothing is measured if phases is None).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+class ingestProgress:
+    """
+    Throughput and progress of an ingestion: files done and remaining, rows/sec, bytes/sec, time per phase
+    and ETA. A progress line is printed every interval seconds and a JSON summary at the end.
+
+    totalFiles  : number of files to load (the ETA is not computed if None)
+    totalBytes  : uncompressed size of the files to load (the ETA is computed from the files if None)
+    interval    : seconds between two progress lines
+    summaryFile : JSON file receiving the summary (optional)
+    """
+
+    def __init__(self, totalFiles=None, totalBytes=None, interval=30, summaryFile=None):
+        self.totalFiles = totalFiles
+        self.totalBytes = totalBytes
+        self.interval = interval
+        self.summaryFile = summaryFile
+        self.files = 0
+        self.failed = 0
+        self.skipped = 0
+        self.rows = 0
+        self.bytes = 0
+        self.phases = {phase: 0.0 for phase in ingestPhases}
+        self.fileTimes = []
+        self.start = time.time()
+        self.lastReport = self.start
+
+    def fileDone(self, fileName, rows, size, phases=None, failed=False, skipped=False):
+        """
+        Records a loaded (or failed, or unchanged) file.
+
+        rows   : number of loaded rows
+        size   : size of the file in bytes
+        phases : seconds spent in every phase {phase : seconds}
+        """
+        self.files += 1
+        self.failed += failed
+        self.skipped += skipped
+        self.rows += rows
+        self.bytes += size
+        for phase, seconds in (phases or {}).items():
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self.fileTimes.append((sum((phases or {}).values()), fileName, rows))
+        if time.time() - self.lastReport >= self.interval:
+            self.report()
+
+    def eta(self):
+        """
+        Returns the estimated remaining seconds, or None if the amount of remaining work is unknown.
+        """
+        elapsed = time.time() - self.start
+        if self.totalBytes and self.bytes > 0:
+            return elapsed * max(self.totalBytes - self.bytes, 0) / self.bytes
+        if self.totalFiles and self.files > 0:
+            return elapsed * max(self.totalFiles - self.files, 0) / self.files
+        return None
+
+    def report(self):
+        self.lastReport = time.time()
+        elapsed = max(self.lastReport - self.start, 1e-9)
+        eta = self.eta()
+        print('Progress :', self.files, '/', self.totalFiles if self.totalFiles is not None else '?', 'files,',
+              self.failed, 'failed,', self.rows, 'rows,', round(self.rows / elapsed), 'rows/s,',
+              round(self.bytes / elapsed / 2 ** 20, 2), 'MB/s, ETA',
+              str(datetime.timedelta(seconds=round(eta))) if eta is not None else '?')
+
+    def summary(self, slowest=5):
+        """
+        Returns the summary of the ingestion, with the slowest files.
+        """
+        elapsed = max(time.time() - self.start, 1e-9)
+        return {'files': self.files, 'failed': self.failed, 'skipped': self.skipped,
+                'remaining': self.totalFiles - self.files if self.totalFiles is not None else None,
+                'rows': self.rows, 'bytes': self.bytes, 'seconds': elapsed,
+                'rowsPerSec': self.rows / elapsed, 'bytesPerSec': self.bytes / elapsed,
+                'phases': self.phases,
+                'slowestFiles': [{'file': fileName, 'seconds': seconds, 'rows': rows}
+                                 for seconds, fileName, rows in sorted(self.fileTimes, reverse=True)[:slowest]]}
+
+    def finish(self):
+        """
+        Prints the JSON summary and stores it in summaryFile.
+        """
+        summary = self.summary()
+        print(json.dumps(summary))
+        if self.summaryFile is not None:
+            with open(self.summaryFile, 'w') as file:
+                json.dump(summary, file, indent=2)
+        return summary
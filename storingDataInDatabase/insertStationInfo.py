@@ -1,59 +1,117 @@
 #!/usr/bin/python
 import csv
+import re
+import sys
+
 import psycopg2
-from config import config
+from psycopg2.extras import execute_values
+
+import dbSession
+from SQL.schema import migrate
+
+# the station_info table is created by SQL/migrations/002_station_info.sql; tables created before the primary key
+# was added need a unique index on sid for the upsert
+uniqueSidQuery = ("SELECT 1 FROM pg_index WHERE indrelid = 'station_info'::regclass AND indisunique "
+                  "AND indpred IS NULL AND indexprs IS NULL AND indnatts = 1 AND indkey[0] = "
+                  "(SELECT attnum FROM pg_attribute WHERE attrelid = 'station_info'::regclass AND attname = 'sid')")
+
+# Point(longitude latitude) WKT of the station file
+pointPattern = re.compile(r'Point\(\s*([-\d.]+)\s+([-\d.]+)\s*\)')
+
+
+def readStationFile(inputFile):
+    """
+    Parses the station file (row number, stationID, Point(longitude latitude), address).
+    Returns a list of (stationID, longitude, latitude, address), the last row wins for repeated stationIDs.
+    """
+    stations = {}
+    with open(inputFile, encoding="utf-8", newline="") as csv_file:
+        for row in csv.reader(csv_file, delimiter=","):
+            point = pointPattern.match(row[2].strip())
+            if point is None:
+                print('Skipping row without point information :', row)
+                continue
+            stations[int(row[1])] = (int(row[1]), float(point.group(1)), float(point.group(2)), row[3])
+    return list(stations.values())
 
-# SQL query to create stationInformation table
-# query = CREATE TABLE stationInfo(sid int not null, geog geography(POINT,4326), addressInfo varchar)
 
 def stationInfoInsertion(inputFile):
 
     """
     Inserts station information into the database (database connection params specified in database.ini file).
-    
-    inputFile : File containing station information (-stationAdd.txt file in Data folder) 
+    The file is parsed once and all stations are upserted on stationID with a single statement into a
+    geography(POINT) column with a GiST index.
+
+    inputFile : File containing station information (stationInfo.csv file in Data folder)
     """
-    
+
     # Connect to the PostgreSQL database server """
     conn = None
     try:
-        # read connection parameters
-        params = config()
+        stations = readStationFile(inputFile)
 
         # connect to the PostgreSQL server
         print('Connecting to the PostgreSQL database...')
-        conn = psycopg2.connect(**params)
+        conn = dbSession.connect()
+
+        # create the tables of the pending migrations
+        migrate(conn)
 
         # create a cursor
         cur = conn.cursor()
+        cur.execute(uniqueSidQuery)
+        if cur.fetchone() is None:
+            cur.execute('CREATE UNIQUE INDEX station_info_sid ON station_info (sid)')
 
-        csv_file = open("stationInfo.csv", encoding="utf-8", errors="",
-                        newline="")
-        f = csv.reader(csv_file, delimiter=",")
-        for row in f:
-            for i in range(len(row)):
-                query = "insert into station_info values("+row[1]+','+row[2]+',\''+row[3]+'\''+")"
-            
-            # executes query
-            cur.execute(query)
+        # all stations in one round-trip
+        execute_values(cur, 'INSERT INTO station_info (sid, geog, addressinfo) VALUES %s '
+                            'ON CONFLICT (sid) DO UPDATE SET geog = EXCLUDED.geog, addressinfo = EXCLUDED.addressinfo',
+                       stations, template='(%s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)',
+                       page_size=max(len(stations), 1))
         conn.commit()
         cur.close()
-    
+        print('Inserted', len(stations), 'stations')
+
     # Exception handling
     except (Exception, psycopg2.DatabaseError) as error:
         print(error)
     finally:
         if conn is not None:
             # close database connection
-            conn.close()
-            print('Database connection closed.')
+            dbSession.release(conn)
+            print('Database connection released.')
+
+
+def stationsWithinRadius(longitude, latitude, radius):
+    """
+    Returns the stations within radius metres of the point, nearest first, using the GiST index on geog.
+    Every station is returned as (stationID, distance in metres, address).
+    """
+    conn = None
+    try:
+        print('Connecting to the PostgreSQL database...')
+        conn = dbSession.connect()
+        cur = conn.cursor()
+        cur.execute('SELECT sid, ST_Distance(geog, point), addressinfo FROM station_info, '
+                    '(SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography AS point) AS p '
+                    'WHERE ST_DWithin(geog, point, %s) ORDER BY geog <-> point',
+                    (longitude, latitude, radius))
+        stations = cur.fetchall()
+        cur.close()
+        return stations
+    finally:
+        if conn is not None:
+            dbSession.release(conn)
+            print('Database connection released.')
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    if len(sys.argv) == 5 and sys.argv[1] == 'radius':
+        for station in stationsWithinRadius(float(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4])):
+            print(*station)
+    elif len(sys.argv) < 2:
         print("Error : Incorrect number of input parameters given : "+ str(len(sys.argv) - 1))
         print("Input Parameters-> input FileName")
+        print("Stations within a radius-> radius, longitude, latitude, radius in metres")
     else:
         stationInfoInsertion(sys.argv[1])
-
-    
@@ -1,99 +1,524 @@
 import csv
+import hashlib
+import io
+import multiprocessing
+import os
 import sys
+import time
+import zipfile
+from functools import partial
+from multiprocessing.util import Finalize
 from os import listdir
 from os.path import isfile, join
 
 import pandas as pd
 import psycopg2
+from psycopg2 import sql
 
-from config import config
-from storingZipFileInDatabase.unZipAirPollution import getFolder
+import dbSession
+from ETL.ETL_pivot import parameterNames
+from SQL.schema import ensurePartitions
+from storingDataInDatabase.ingestProgress import ingestProgress, measurePhase
+from storingDataInDatabase.rollups import hasRollups, refreshRollups
+from storingDataInDatabase.soramameParser import cleanSoramameFrame, copyBuffer, copyColumnTypes, readSoramameFrame
+from storingDataInDatabase.unZipAirPollution import expandMember, getFolder, iterMemberContents, listMembers, outerMember
+
+
+def cleanRow(row):
+    """
+    Converts a row of a soramame CSV file into the column order of the data table.
+
+    Missing values ('', '-' or values containing '#') are replaced by 9999, the date (column 1) and hour (column 2)
+    are joined into a timestamp and the wind direction (column 15) is stored as -1.
+    """
+    for i in range(len(row)):
+        # filling missing values
+        if row[i] == '' or row[i] == '-' or '#' in row[i]:
+            row[i] = '9999'
+    return [row[0], row[1] + ' ' + row[2] + ':00:00'] + row[3:15] + ['-1'] + row[16:19]
+
+
+def copyFile(cur, tableName, csvFile, phases=None):
+    """
+    Parses an opened soramame CSV file (binary or text stream) with the vectorized parser, cleans it like cleanRow
+    and loads it with a single binary COPY FROM STDIN. The columns of tableName must have the copyColumnTypes.
+    Returns the number of loaded rows.
+
+    phases : dictionary receiving the seconds spent decoding, cleaning and loading (optional)
+    """
+    with measurePhase(phases, 'decode'):
+        frame = readSoramameFrame(csvFile)
+    with measurePhase(phases, 'clean'):
+        buffer = copyBuffer(*cleanSoramameFrame(frame))
+    with measurePhase(phases, 'load'):
+        cur.copy_expert('COPY ' + tableName + ' FROM STDIN WITH (FORMAT binary)', buffer)
+    return len(frame)
+
+
+def prepareTable(cur, tableName, dedupe=False):
+    """
+    Creates the manifest of loaded files and the unique (sname, time) index used by the upserts.
+
+    dedupe : delete duplicate (sname, time) rows loaded before, the unique index cannot be created otherwise
+    """
+    cur.execute('CREATE TABLE IF NOT EXISTS ingest_manifest (table_name varchar NOT NULL, file_name varchar NOT NULL, '
+                'sha256 char(64) NOT NULL, rows integer, loaded_at timestamp DEFAULT now(), '
+                'PRIMARY KEY (table_name, file_name))')
+    if dedupe:
+        cur.execute('DELETE FROM ' + tableName + ' a USING ' + tableName + ' b '
+                    'WHERE a.ctid < b.ctid AND a.sname = b.sname AND a.time = b.time')
+        print('Deleted', cur.rowcount, 'duplicate rows')
+    # tables created by SQL.schema already have the (sname, time) primary key; unique indexes on other columns,
+    # partial or expression indexes cannot be used by ON CONFLICT (sname, time)
+    cur.execute('SELECT 1 FROM pg_index i WHERE i.indrelid = to_regclass(%s) AND i.indisunique '
+                'AND i.indpred IS NULL AND i.indexprs IS NULL '
+                'AND (SELECT array_agg(a.attname::text ORDER BY a.attname) FROM unnest(i.indkey::int2[]) k(attnum) '
+                "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum) = ARRAY['sname', 'time']",
+                (tableName,))
+    if cur.fetchone() is None:
+        cur.execute('CREATE UNIQUE INDEX ' + tableName + '_sname_time_key ON ' + tableName + ' (sname, time)')
+
+
+# updates the sensor values of an existing (sname, time) row, so a reloaded file replaces its rows
+upsertClause = (' ON CONFLICT (sname, time) DO UPDATE SET ' +
+                ', '.join(column + ' = EXCLUDED.' + column for column in parameterNames[2:]))
+
+
+def isLoaded(cur, tableName, fileName, digest):
+    """
+    Returns True if the manifest records fileName as loaded into tableName with the given SHA-256.
+    """
+    dbSession.executePrepared(cur, 'manifest_lookup',
+                              'SELECT sha256 FROM ingest_manifest WHERE table_name = $1 AND file_name = $2',
+                              [tableName, fileName])
+    entry = cur.fetchone()
+    return entry is not None and entry[0] == digest
+
+
+def recordLoad(cur, tableName, fileName, digest, rows):
+    """
+    Records fileName in the manifest, in the transaction that loaded it.
+    """
+    cur.execute('INSERT INTO ingest_manifest (table_name, file_name, sha256, rows) VALUES (%s, %s, %s, %s) '
+                'ON CONFLICT (table_name, file_name) DO UPDATE '
+                'SET sha256 = EXCLUDED.sha256, rows = EXCLUDED.rows, loaded_at = now()',
+                (tableName, fileName, digest, rows))
+
+
+def loadFile(cur, tableName, fileName, content, phases=None):
+    """
+    Loads the content (bytes) of a soramame CSV file idempotently.
+
+    Files whose SHA-256 is already in the manifest are skipped. Other files are copied into a temporary
+    staging table and merged with INSERT ... ON CONFLICT (sname, time), so a reloaded file replaces its rows
+    instead of duplicating them. The rollups of the loaded stations and days are refreshed in the same transaction.
+    Returns the number of loaded rows, or None for an unchanged file.
+
+    phases : dictionary receiving the seconds spent in every phase of the load (optional)
+    """
+    with measurePhase(phases, 'load'):
+        digest = hashlib.sha256(content).hexdigest()
+        if isLoaded(cur, tableName, fileName, digest):
+            return None
+
+        # the staging table has the column types of the binary COPY, the merge casts them to the types of tableName
+        staging = 'staging_' + tableName
+        cur.execute('CREATE TEMP TABLE IF NOT EXISTS ' + staging + ' (' +
+                    ', '.join(column + ' ' + columnType for column, columnType in zip(parameterNames, copyColumnTypes)) +
+                    ') ON COMMIT DELETE ROWS')
+    rows = copyFile(cur, staging, io.BytesIO(content), phases)
+    with measurePhase(phases, 'load'):
+        # partitioned tables get the partitions of the loaded months
+        cur.execute("SELECT DISTINCT date_trunc('month', time) FROM " + staging)
+        ensurePartitions(cur, tableName, [row[0] for row in cur.fetchall()])
+        cur.execute('INSERT INTO ' + tableName + ' SELECT DISTINCT ON (sname, time) * FROM ' + staging + upsertClause)
+        # daily and monthly rollups of the loaded stations and days (only kept for the rollup table)
+        if hasRollups(cur, tableName):
+            cur.execute('SELECT array_agg(DISTINCT sname), min(time), max(time) FROM ' + staging)
+            stations, startTime, endTime = cur.fetchone()
+            if stations is not None:
+                refreshRollups(cur, tableName, stations, startTime, endTime)
+        recordLoad(cur, tableName, fileName, digest, rows)
+    return rows
+
+
+# columns of the append-only ingestion ledger
+ledgerColumns = ['zipFile', 'file', 'rows', 'duration', 'error', 'finishedAt']
+
+# long-lived connection and zip file of a worker process of the parallel ingestion
+workerConnection = None
+workerZipFile = None
+
+
+def connectWorker():
+    """
+    Opens the database connection kept by a worker process, replacing a connection that was lost.
+    """
+    global workerConnection
+    if workerConnection is not None:
+        # closed connections are discarded by the pool
+        dbSession.release(workerConnection)
+    workerConnection = dbSession.connect()
+    Finalize(workerConnection, workerConnection.close, exitpriority=10)
+
+
+def initializeWorker(inputZipFile):
+    """
+    Opens the database connection and the zip file kept by a worker process for all the files it loads.
+    """
+    global workerZipFile
+    connectWorker()
+    workerZipFile = zipfile.ZipFile(inputZipFile, 'r')
+    Finalize(workerZipFile, workerZipFile.close, exitpriority=10)
+
+
+def copyMember(tableName, memberName):
+    """
+    Loads one member of the zip file on the connection of the worker. A nested zip file is expanded like copyData
+    does and every file it holds is loaded in its own transaction.
+    Returns the list of (outcome, size, phases, skipped) of the loaded files, see loadMember.
+    """
+    start = time.time()
+    phases = {}
+    try:
+        with measurePhase(phases, 'unzip'):
+            members = expandMember(memberName, workerZipFile.read(memberName))
+    except Exception as error:
+        return [((memberName, 0, time.time() - start, str(error)), 0, phases, False)]
+    outcomes = []
+    for fileName, content in members:
+        outcomes.append(loadMember(tableName, fileName, content, start, phases))
+        start = time.time()
+        phases = {}
+    return outcomes
+
+
+def loadMember(tableName, fileName, content, start, phases):
+    """
+    Loads the content of one file idempotently in its own transaction on the connection of the worker.
+    Returns the ledger outcome (file, rows, duration, error) where error is '' on success, the size of the file,
+    the seconds spent in every phase and whether the file was skipped as unchanged. An outcome is returned for every
+    file, even if the connection is lost.
+    """
+    try:
+        if workerConnection is None or workerConnection.closed:
+            # the connection was lost while loading a previous file
+            connectWorker()
+        cur = workerConnection.cursor()
+        rows = loadFile(cur, tableName, fileName, content, phases)
+        with measurePhase(phases, 'commit'):
+            workerConnection.commit()
+        cur.close()
+        # unchanged files are recorded with 0 rows
+        return (fileName, rows or 0, time.time() - start, ''), len(content), phases, rows is None
+    except (Exception, psycopg2.DatabaseError) as error:
+        if workerConnection is not None and not workerConnection.closed:
+            try:
+                workerConnection.rollback()
+            except (Exception, psycopg2.DatabaseError):
+                # the connection dropped, the next file reconnects
+                pass
+        return (fileName, 0, time.time() - start, str(error)), len(content), phases, False
+
+
+def appendLedger(ledgerFile, zipFileName, outcome):
+    """
+    Appends the outcome of one file to the ledger and flushes it to disk.
+    """
+    newLedger = not os.path.isfile(ledgerFile)
+    with open(ledgerFile, 'a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        if newLedger:
+            writer.writerow(ledgerColumns)
+        writer.writerow([zipFileName] + list(outcome) + [time.strftime('%Y-%m-%d %H:%M:%S')])
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def readFailedFiles(ledgerFile, zipFileName):
+    """
+    Returns the files of the given zip file whose latest ledger entry is a failure.
+    """
+    latest = {}
+    if os.path.isfile(ledgerFile):
+        with open(ledgerFile, newline='', encoding='utf-8') as file:
+            for entry in csv.DictReader(file):
+                if entry['zipFile'] == zipFileName:
+                    latest[entry['file']] = entry['error']
+    return [memberName for memberName, error in latest.items() if error != '']
 
 
 class insertDataIntoDatabaseFromZipFile:
     """
     Unzips soramame data and inserts the data into database and stores uninserted files in a CSV file.
 
-    inputZipFile : Zip folder containing soramame data
-    tempFolder   : Path to store unzipped files
+    inputZipFile     : Zip folder containing soramame data
+    tempFolder       : Path to store unzipped files (only used by insertData)
+    progressInterval : seconds between two progress lines
+    summaryFile      : JSON file receiving the throughput summary of the ingestion (optional)
     NOTE : Specify the name of the database in database.ini file
     
     """
 
-    def __init__(self, inputZipFile, tempFolder, tableName="data"):
-        self.inputFolder = getFolder(inputZipFile, tempFolder)
+    def __init__(self, inputZipFile, tempFolder=None, tableName="data", progressInterval=30, summaryFile=None):
+        self.inputZipFile = inputZipFile
+        self.tempFolder = tempFolder
+        self.inputFolder = None
         self.table = tableName
         self.unsuccessfulInsertionFiles = []
+        self.progressInterval = progressInterval
+        self.summaryFile = summaryFile
+        self.progress = None
+
+    def newProgress(self, memberNames=None, nested=False):
+        """
+        Starts the telemetry of an ingestion of the given members of the zip file (default = all members).
+
+        nested : count the members of nested zip files instead of the zip files, as loaded by copyData and copyDataParallel
+        """
+        with zipfile.ZipFile(self.inputZipFile, 'r') as zipFile:
+            members = [(memberName, size) for memberName, size in listMembers(zipFile, nested)
+                       if memberNames is None or outerMember(memberName, memberNames) is not None]
+        self.progress = ingestProgress(len(members), sum(size for memberName, size in members),
+                                       self.progressInterval, self.summaryFile)
+        return self.progress
+
+    def insertData(self, dedupe=False):
+        """
+        Inserts the unzipped files row by row. Like copyData, files already loaded with the same content
+        are skipped, reloaded files replace their rows and the rollups of the loaded stations and days are refreshed.
 
-    def insertData(self):
-        inputFileName = self.inputFolder
+        dedupe : delete duplicate (sname, time) rows loaded before the unique index existed
+        """
+        conn = dbSession.connect()
+        try:
+            prepareTable(conn.cursor(), self.table, dedupe)
+            conn.commit()
+        finally:
+            dbSession.release(conn)
+        unzipTime = {}
+        with measurePhase(unzipTime, 'unzip'):
+            if self.inputFolder is None:
+                self.inputFolder = getFolder(self.inputZipFile, self.tempFolder)
         files = [f for f in listdir(self.inputFolder) if isfile(join(self.inputFolder, f))]
+        self.progress = ingestProgress(len(files), sum(os.path.getsize(join(self.inputFolder, f)) for f in files),
+                                       self.progressInterval, self.summaryFile)
+        self.progress.phases['unzip'] += unzipTime['unzip']
         for file in files:
-            inputFileName = inputFileName + '/' + file
+            inputFileName = join(self.inputFolder, file)
+            phases = {}
+            rows = 0
+            failed = False
+            skipped = False
 
             # Connect to the PostgreSQL database server
             conn = None
             try:
-                # read connection parameters
-                params = config()
-
                 # connect to the PostgreSQL server
                 print('Connecting to the PostgreSQL database...')
-                conn = psycopg2.connect(**params)
+                conn = dbSession.connect()
 
                 # create a cursor
                 cur = conn.cursor()
 
-                # reading csv file
-                csv_file = open(self.inputFileName, encoding="cp932", errors="", newline="")
-
-                f = csv.reader(csv_file, delimiter=",", doublequote=True, lineterminator="\r\n", quotechar='"',
-                               skipinitialspace=True)
+                with measurePhase(phases, 'load'):
+                    with open(inputFileName, 'rb') as binaryFile:
+                        digest = hashlib.sha256(binaryFile.read()).hexdigest()
+                    skipped = isLoaded(cur, self.table, file, digest)
+                if skipped:
+                    print('Unchanged', file)
+                    cur.close()
+                    continue
 
-                header = next(f)
-                for row in f:
-                    for i in range(len(row)):
-
-                        # filling missing values
-                        # print(row[i])
-                        if row[i] == '' or row[i] == '-' or '#' in row[i]:
-                            row[i] = '9999'
+                # reading csv file
+                with measurePhase(phases, 'decode'):
+                    with open(inputFileName, encoding="cp932", errors="", newline="") as csv_file:
+                        f = csv.reader(csv_file, delimiter=",", doublequote=True, lineterminator="\r\n",
+                                       quotechar='"', skipinitialspace=True)
+                        header = next(f)
+                        csvRows = list(f)
 
-                        # writing query
-                    query = 'insert into ' + self.table + ' values(' + row[0] + ',\'' + row[1] + ' ' + row[
-                        2] + ':00:00\'' + ',' + \
-                            row[3] + ',' + row[4] + ',' + row[5] + ',' \
-                            + row[6] + ',' + row[7] + ',' + row[8] + ',' + row[9] + ',' + row[10] + ',' + row[
-                                11] + ',' + \
-                            row[12] + ',' + row[13] + ',' + row[14] + ',-1' + ',' + row[16] + ',' + row[17] + ',' + row[
-                                18] + ")"
+                # partitioned tables get the partitions of the loaded months (hour 24 is midnight of the next day)
+                with measurePhase(phases, 'load'):
+                    days = {(row[1], row[2].strip() == '24') for row in csvRows}
+                    loadedDays = [pd.Timestamp(day) + pd.Timedelta(days=int(nextDay)) for day, nextDay in days]
+                    ensurePartitions(cur, self.table, loadedDays)
 
+                # prepared once per connection, executed for every row
+                placeholders = ', '.join('$' + str(i + 1) for i in range(len(parameterNames)))
+                insertQuery = sql.SQL('INSERT INTO {} VALUES (' + placeholders + ')' + upsertClause).format(
+                    sql.Identifier(self.table))
+                for row in csvRows:
+                    # filling missing values
+                    with measurePhase(phases, 'clean'):
+                        row = cleanRow(row)
                     # executing the query
-                    cur.execute(query)
-                conn.commit()
+                    with measurePhase(phases, 'load'):
+                        dbSession.executePrepared(cur, 'upsert_' + self.table, insertQuery, row)
+                rows = len(csvRows)
+                with measurePhase(phases, 'load'):
+                    # daily and monthly rollups of the loaded stations and days (only kept for the rollup table)
+                    if rows > 0 and hasRollups(cur, self.table):
+                        refreshRollups(cur, self.table, sorted({int(row[0]) for row in csvRows}),
+                                       min(loadedDays), max(loadedDays))
+                    recordLoad(cur, self.table, file, digest, rows)
+                with measurePhase(phases, 'commit'):
+                    conn.commit()
                 print('Success')
 
                 # close the communication with the PostgreSQL
                 cur.close()
 
             except (Exception, psycopg2.DatabaseError) as error:
-                print(error, self.inputFileName)
-                self.unsuccessfulInsertionFiles.append(self.inputFileName + ' ' + str(error))
+                print(error, inputFileName)
+                self.unsuccessfulInsertionFiles.append(inputFileName + ' ' + str(error))
+                failed = True
 
             finally:
                 if conn is not None:
-                    conn.close()
-                    print('Database connection closed.')
+                    dbSession.release(conn)
+                    print('Database connection released.')
                 pd.DataFrame(self.unsuccessfulInsertionFiles).to_csv('unsuccessfulInsertionFiles.csv')
+                self.progress.fileDone(file, rows, os.path.getsize(inputFileName), phases, failed=failed, skipped=skipped)
+        self.progress.finish()
+
+    def copyData(self, dedupe=False, unzipWorkers=None):
+        """
+        Bulk ingest mode: reads the CSV files directly from the zip file (no temporary unzip folder),
+        cleans them in memory and loads every file with one COPY FROM STDIN round-trip.
+        Files already loaded with the same content are skipped and reloaded files replace their rows.
+
+        dedupe       : delete duplicate (sname, time) rows loaded before the unique index existed
+        unzipWorkers : decompress the files in this many processes while loading (default = in the loading process)
+        """
+        conn = None
+        # nested zip files are expanded by iterMemberContents, every inner file is reported
+        progress = self.newProgress(nested=True)
+        try:
+            print('Connecting to the PostgreSQL database...')
+            conn = dbSession.connect()
+            cur = conn.cursor()
+            prepareTable(cur, self.table, dedupe)
+            conn.commit()
+            unzipStart = time.perf_counter()
+            for memberName, content in iterMemberContents(self.inputZipFile, parallel=unzipWorkers is not None,
+                                                          workers=unzipWorkers):
+                # time spent waiting for the decompressed member
+                phases = {'unzip': time.perf_counter() - unzipStart}
+                try:
+                    rows = loadFile(cur, self.table, memberName, content, phases)
+                    with measurePhase(phases, 'commit'):
+                        conn.commit()
+                    if rows is None:
+                        print('Unchanged', memberName)
+                    else:
+                        print('Success', memberName, rows, 'rows')
+                    progress.fileDone(memberName, rows or 0, len(content), phases, skipped=rows is None)
+                except (Exception, psycopg2.DatabaseError) as error:
+                    conn.rollback()
+                    print(error, memberName)
+                    self.unsuccessfulInsertionFiles.append(memberName + ' ' + str(error))
+                    progress.fileDone(memberName, 0, len(content), phases, failed=True)
+                unzipStart = time.perf_counter()
+            cur.close()
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(error, self.inputZipFile)
+            self.unsuccessfulInsertionFiles.append(self.inputZipFile + ' ' + str(error))
+        finally:
+            if conn is not None:
+                dbSession.release(conn)
+                print('Database connection released.')
+            pd.DataFrame(self.unsuccessfulInsertionFiles).to_csv('unsuccessfulInsertionFiles.csv')
+            progress.finish()
+
+    def copyDataParallel(self, workers=4, ledgerFile='ingestLedger.csv', retryFailed=False, dedupe=False):
+        """
+        Parallel bulk ingest mode: the files of the zip file are loaded by a pool of worker processes.
+        Every worker keeps one connection for all its files and loads each file in its own transaction.
+        The outcome of every file (rows, duration, error) is appended to ledgerFile.
+        Files already loaded with the same content are skipped and reloaded files replace their rows.
+
+        workers     : number of worker processes
+        ledgerFile  : append-only CSV ledger of the loaded files
+        retryFailed : only load the files whose latest ledger entry is a failure
+        dedupe      : delete duplicate (sname, time) rows loaded before the unique index existed
+        """
+        start = time.time()
+        conn = dbSession.connect()
+        try:
+            prepareTable(conn.cursor(), self.table, dedupe)
+            conn.commit()
+        finally:
+            dbSession.release(conn)
+        with zipfile.ZipFile(self.inputZipFile, 'r') as zipFile:
+            memberNames = [member.filename for member in zipFile.infolist() if not member.is_dir()]
+        if retryFailed:
+            # the nested zip files holding failed files are loaded again, their unchanged files are skipped
+            outerNames = set(memberNames)
+            failedMembers = [outerMember(fileName, outerNames) for fileName in readFailedFiles(ledgerFile, self.inputZipFile)]
+            memberNames = list(dict.fromkeys(memberName for memberName in failedMembers if memberName is not None))
+        print('Loading', len(memberNames), 'members with', workers, 'workers')
+        # nested zip files are expanded by copyMember, every inner file is reported
+        progress = self.newProgress(set(memberNames), nested=True)
 
+        rows = 0
+        files = 0
+        failed = 0
+        pool = multiprocessing.Pool(workers, initializer=initializeWorker, initargs=(self.inputZipFile,))
+        try:
+            for outcomes in pool.imap_unordered(partial(copyMember, self.table), memberNames):
+                for outcome, size, phases, skipped in outcomes:
+                    appendLedger(ledgerFile, self.inputZipFile, outcome)
+                    fileName, fileRows, duration, error = outcome
+                    rows += fileRows
+                    files += 1
+                    if error != '':
+                        failed += 1
+                        print(error, fileName)
+                        self.unsuccessfulInsertionFiles.append(fileName + ' ' + error)
+                    # phase times are summed over the workers
+                    progress.fileDone(fileName, fileRows, size, phases, failed=error != '', skipped=skipped)
+        finally:
+            # workers exit normally, which closes their connections
+            pool.close()
+            pool.join()
+        print('Loaded', rows, 'rows from', files - failed, 'files in', time.time() - start, 'sec,',
+              failed, 'failed (see ' + ledgerFile + ')')
+        progress.finish()
 
 if __name__ == '__main__':
-    if len(sys.argv) == 4:
-        soramameDataInsertion = insertDataIntoDatabaseFromZipFile(sys.argv[1], sys.argv[2], sys.argv[3])
-        soramameDataInsertion.insertData()
-    elif len(sys.argv) == 3:
-        soramameDataInsertion = insertDataIntoDatabaseFromZipFile(sys.argv[1], sys.argv[2], tableName='data')
-        soramameDataInsertion.insertData()
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv if arg.startswith('--') and '=' in arg)
+    arguments = [arg for arg in sys.argv if not arg.startswith('--')]
+    # --progress=SECONDS between progress lines, --summary=FILE receiving the JSON summary
+    telemetry = {'progressInterval': float(options.get('progress', 30)), 'summaryFile': options.get('summary')}
+    if 'workers' in options or '--retry' in sys.argv:
+        # parallel bulk ingest mode, optionally retrying the failed files of the ledger
+        if len(arguments) in [2, 3]:
+            soramameDataInsertion = insertDataIntoDatabaseFromZipFile(arguments[1], tableName=arguments[2] if len(arguments) == 3 else 'data', **telemetry)
+            soramameDataInsertion.copyDataParallel(workers=int(options.get('workers', 4)),
+                                                   ledgerFile=options.get('ledger', 'ingestLedger.csv'),
+                                                   retryFailed='--retry' in sys.argv, dedupe='--dedupe' in sys.argv)
+        else:
+            print("Error : Incorrect number of input parameters given : " + str(len(arguments) - 1))
+            print("Input Parameters-> Zip Folder path, table name (default = data), --workers=N, --ledger=FILE, --retry, --dedupe")
+    elif '--copy' in sys.argv:
+        # bulk ingest mode, no temporary folder
+        if len(arguments) in [2, 3]:
+            soramameDataInsertion = insertDataIntoDatabaseFromZipFile(arguments[1], tableName=arguments[2] if len(arguments) == 3 else 'data', **telemetry)
+            soramameDataInsertion.copyData(dedupe='--dedupe' in sys.argv,
+                                           unzipWorkers=int(options['unzip']) if 'unzip' in options else None)
+        else:
+            print("Error : Incorrect number of input parameters given : " + str(len(arguments) - 1))
+            print("Input Parameters-> Zip Folder path, table name (default = data), --copy, --unzip=N, --dedupe")
+    elif len(arguments) == 4:
+        soramameDataInsertion = insertDataIntoDatabaseFromZipFile(arguments[1], arguments[2], arguments[3], **telemetry)
+        soramameDataInsertion.insertData(dedupe='--dedupe' in sys.argv)
+    elif len(arguments) == 3:
+        soramameDataInsertion = insertDataIntoDatabaseFromZipFile(arguments[1], arguments[2], tableName='data', **telemetry)
+        soramameDataInsertion.insertData(dedupe='--dedupe' in sys.argv)
     else:
-        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
-        print("Input Parameters-> Zip Folder path, temporary folder path, table name (default = data) ")
+        print("Error : Incorrect number of input parameters given : " + str(len(arguments) - 1))
+        print("Input Parameters-> Zip Folder path, temporary folder path, table name (default = data), --dedupe")
+        print("Bulk ingest-> Zip Folder path, table name (default = data), --copy, --unzip=N, --dedupe")
+        print("Parallel bulk ingest-> Zip Folder path, table name (default = data), --workers=N, --ledger=FILE, --retry, --dedupe")
+        print("Telemetry-> --progress=SECONDS between progress lines, --summary=FILE for the JSON summary")
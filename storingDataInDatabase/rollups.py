@@ -0,0 +1,105 @@
+import sys
+
+import psycopg2
+
+import dbSession
+from ETL.ETL_pivot import missingValues, parameterNames
+
+# parameters kept in the rollup tables (wind direction is always stored as -1)
+rollupParameters = [param for param in parameterNames[2:] if param != 'wd']
+
+# data table summarized by the rollup tables (the rollup rows have no table name, other tables are not summarized)
+rollupTable = 'data'
+
+
+def hasRollups(cur, tableName=rollupTable):
+    """
+    Returns True if the rollups of tableName are maintained: tableName is the rollup table and the rollup tables
+    (SQL/migrations/003_rollups.sql) exist.
+    """
+    if tableName != rollupTable:
+        return False
+    cur.execute("SELECT to_regclass('rollup_daily')")
+    return cur.fetchone()[0] is not None
+
+
+def refreshRollups(cur, tableName, stations, startTime, endTime):
+    """
+    Recomputes the daily and monthly rollups of the given stations for the days and months touched by
+    [startTime, endTime]. Only these rows of the rollup tables are replaced.
+
+    tableName : table containing soramame data
+    stations  : list of stationIDs of the loaded rows
+    startTime : first timestamp of the loaded rows
+    endTime   : last timestamp of the loaded rows
+    """
+    if tableName != rollupTable:
+        raise ValueError('Error : the rollup tables summarize the ' + rollupTable + ' table, not ' + tableName)
+    values = ', '.join("('" + param + "', " + param + ")" for param in rollupParameters)
+    missing = ', '.join(str(value) for value in missingValues)
+    # rows of every touched day, one row per parameter
+    unpivot = 'FROM ' + tableName + ' CROSS JOIN LATERAL (VALUES ' + values + ') AS p(param, value) '
+    condition = (' WHERE sname = ANY(%(stations)s) AND time >= %(firstDay)s AND time < %(lastDay)s + 1 '
+                 'AND p.value IS NOT NULL AND p.value NOT IN (' + missing + ')')
+    arguments = {'stations': list(stations)}
+    cur.execute('SELECT %s::date, %s::date, date_trunc(\'month\', %s::date)::date, '
+                '(date_trunc(\'month\', %s::date) + interval \'1 month\')::date',
+                (startTime, endTime, startTime, endTime))
+    arguments['firstDay'], arguments['lastDay'], arguments['firstMonth'], arguments['endMonth'] = cur.fetchone()
+
+    for table in ['rollup_daily', 'rollup_daily_exceedance']:
+        cur.execute('DELETE FROM ' + table + ' WHERE sname = ANY(%(stations)s) '
+                    'AND day BETWEEN %(firstDay)s AND %(lastDay)s', arguments)
+    cur.execute('INSERT INTO rollup_daily (sname, param, day, n, total, minimum, maximum) '
+                'SELECT sname, p.param, time::date, count(*), sum(p.value), min(p.value), max(p.value) ' +
+                unpivot + condition + ' GROUP BY sname, p.param, time::date', arguments)
+    cur.execute('INSERT INTO rollup_daily_exceedance (sname, param, day, threshold, n_over) '
+                'SELECT sname, p.param, time::date, t.threshold, count(*) FILTER (WHERE p.value > t.threshold) ' +
+                unpivot + 'JOIN rollup_threshold t ON t.param = p.param' + condition +
+                ' GROUP BY sname, p.param, time::date, t.threshold', arguments)
+
+    # months are rebuilt from the daily rollups
+    for table in ['rollup_monthly', 'rollup_monthly_exceedance']:
+        cur.execute('DELETE FROM ' + table + ' WHERE sname = ANY(%(stations)s) '
+                    'AND month >= %(firstMonth)s AND month < %(endMonth)s', arguments)
+    cur.execute('INSERT INTO rollup_monthly (sname, param, month, n, total, minimum, maximum) '
+                'SELECT sname, param, date_trunc(\'month\', day)::date, sum(n), sum(total), min(minimum), max(maximum) '
+                'FROM rollup_daily WHERE sname = ANY(%(stations)s) AND day >= %(firstMonth)s AND day < %(endMonth)s '
+                'GROUP BY sname, param, date_trunc(\'month\', day)', arguments)
+    cur.execute('INSERT INTO rollup_monthly_exceedance (sname, param, month, threshold, n_over) '
+                'SELECT sname, param, date_trunc(\'month\', day)::date, threshold, sum(n_over) '
+                'FROM rollup_daily_exceedance WHERE sname = ANY(%(stations)s) '
+                'AND day >= %(firstMonth)s AND day < %(endMonth)s '
+                'GROUP BY sname, param, date_trunc(\'month\', day), threshold', arguments)
+
+
+def rebuildRollups(tableName='data'):
+    """
+    Recomputes all rollups from the data table, e.g. after adding thresholds to rollup_threshold.
+    """
+    conn = None
+    try:
+        print('Connecting to the PostgreSQL database...')
+        conn = dbSession.connect()
+        cur = conn.cursor()
+        cur.execute('SELECT array_agg(DISTINCT sname), min(time), max(time) FROM ' + tableName)
+        stations, startTime, endTime = cur.fetchone()
+        if stations is not None:
+            refreshRollups(cur, tableName, stations, startTime, endTime)
+        conn.commit()
+        cur.close()
+        print('Rebuilt rollups')
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    finally:
+        if conn is not None:
+            dbSession.release(conn)
+            print('Database connection released.')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 2:
+        rebuildRollups(sys.argv[1] if len(sys.argv) == 2 else 'data')
+    else:
+        print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))
+        print("Input Parameters-> table name (default = data)")
@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from ETL.ETL_pivot import parameterNames
+
+# columns of a raw soramame CSV file: station, date, hour and the sensor columns in the order of the data table
+rawColumns = ['sname', 'date', 'hour'] + parameterNames[2:]
+
+# sensor columns of the data table
+sensorColumns = parameterNames[2:]
+
+# binary COPY signature, flags and header extension length, and end of data marker
+copyHeader = b'PGCOPY\n\xff\r\n\x00' + np.array([0, 0], dtype='>i4').tobytes()
+copyTrailer = np.array([-1], dtype='>i2').tobytes()
+copyEpoch = np.datetime64('2000-01-01T00:00:00', 'us')
+
+# column types of the binary COPY buffer, every staging table is created with them
+copyColumnTypes = ['integer', 'timestamp'] + ['double precision'] * len(sensorColumns)
+
+
+def readSoramameFrame(csvFile, encoding='cp932'):
+    """
+    Reads a raw soramame CSV file (path, binary or text stream) with the C parser. Numeric columns are typed
+    by the parser, columns containing invalid values ('#' flags, text) are returned as strings.
+    """
+    return pd.read_csv(csvFile, header=None, skiprows=1, names=rawColumns, index_col=False, encoding=encoding,
+                       skipinitialspace=True, na_values=['-'], engine='c')
+
+
+def cleanSoramameFrame(frame):
+    """
+    Converts a frame read by readSoramameFrame into typed columns.
+    Returns (stationIDs, timestamps, values) where values is a rows x sensors float64 matrix
+    in which missing values ('', '-', values containing '#') and the wind direction are NaN.
+    """
+    values = np.empty((len(frame), len(sensorColumns)), dtype=np.float64)
+    for i, column in enumerate(sensorColumns):
+        series = frame[column]
+        if column == 'wd':
+            # wind directions are text, they are not stored
+            values[:, i] = np.nan
+        elif pd.api.types.is_numeric_dtype(series):
+            values[:, i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values[:, i] = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    # the dates of a file repeat, they are parsed once each; hour 24 is midnight of the next day
+    timeStamps = (pd.to_datetime(frame['date'], cache=True).to_numpy(dtype='datetime64[ns]') +
+                  frame['hour'].to_numpy(dtype=np.int64).astype('timedelta64[h]'))
+    return frame['sname'].to_numpy(dtype=np.int64), timeStamps, values
+
+
+def parseSoramameFile(csvFile, encoding='cp932'):
+    """
+    Parses a raw soramame CSV file into (stationIDs, timestamps, values), see cleanSoramameFrame.
+    """
+    return cleanSoramameFrame(readSoramameFrame(csvFile, encoding))
+
+
+def copyBuffer(stations, timeStamps, values, missingValue=9999):
+    """
+    Writes parsed rows as a PostgreSQL binary COPY buffer (sname integer, time timestamp, sensor columns
+    double precision) in the column order of the data table, ready for COPY ... FROM STDIN WITH (FORMAT binary).
+    Missing values are written as missingValue and the wind direction as -1.
+    The buffer is assembled as one NumPy record array, without formatting values as text.
+    """
+    rowType = np.dtype([('fields', '>i2'), ('snameLength', '>i4'), ('sname', '>i4'), ('timeLength', '>i4'),
+                        ('time', '>i8')] +
+                       [field for column in sensorColumns for field in [(column + 'Length', '>i4'), (column, '>f8')]])
+    rows = np.empty(len(stations), dtype=rowType)
+    rows['fields'] = 2 + len(sensorColumns)
+    rows['snameLength'] = 4
+    rows['sname'] = stations
+    rows['timeLength'] = 8
+    # PostgreSQL timestamps are microseconds since 2000-01-01
+    rows['time'] = (timeStamps.astype('datetime64[us]') - copyEpoch).astype(np.int64)
+    for i, column in enumerate(sensorColumns):
+        rows[column + 'Length'] = 8
+        rows[column] = -1 if column == 'wd' else np.where(np.isnan(values[:, i]), missingValue, values[:, i])
+    return io.BytesIO(copyHeader + rows.tobytes() + copyTrailer)
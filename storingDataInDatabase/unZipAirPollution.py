@@ -1,5 +1,10 @@
+import io
 import os
+import sys
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 
 
 def getFolder(zipFolder, outputLocation):
@@ -15,6 +20,107 @@ def getFolder(zipFolder, outputLocation):
     return os.path.join(outputLocation, zipFolder.split('.')[0])
 
 
+def expandMember(memberName, content, nested=True):
+    """
+    Returns the (memberName, bytes) of a decompressed member. With nested, a member that is itself a zip file
+    is expanded into its own members, named <member>/<inner member>.
+    """
+    if not nested or not memberName.lower().endswith('.zip'):
+        return [(memberName, content)]
+    members = []
+    with zipfile.ZipFile(io.BytesIO(content), 'r') as innerZip:
+        for member in innerZip.infolist():
+            if not member.is_dir():
+                members.extend(expandMember(memberName + '/' + member.filename, innerZip.read(member), nested))
+    return members
+
+
+def listMembers(zipFile, nested=True, prefix=''):
+    """
+    Returns the (memberName, uncompressed size) of every file yielded by iterMemberContents for an opened zip file.
+    Only the directories of nested zip files are read, but a compressed nested zip is decompressed to reach it.
+    """
+    members = []
+    for member in zipFile.infolist():
+        if member.is_dir():
+            continue
+        if nested and member.filename.lower().endswith('.zip'):
+            with zipFile.open(member) as innerFile, zipfile.ZipFile(innerFile, 'r') as innerZip:
+                members.extend(listMembers(innerZip, nested, prefix + member.filename + '/'))
+        else:
+            members.append((prefix + member.filename, member.file_size))
+    return members
+
+
+def outerMember(memberName, outerNames):
+    """
+    Returns the member of the zip file holding memberName, a member or a <member>/<inner member> name of a nested
+    zip file, or None if outerNames has no such member.
+    """
+    if memberName in outerNames:
+        return memberName
+    for position, character in enumerate(memberName):
+        if character == '/' and memberName[:position].lower().endswith('.zip') and memberName[:position] in outerNames:
+            return memberName[:position]
+    return None
+
+
+# zip file opened once by every decompression worker process
+workerZipFile = None
+
+
+def initializeWorker(zipFolder):
+    global workerZipFile
+    workerZipFile = zipfile.ZipFile(zipFolder, 'r')
+    Finalize(workerZipFile, workerZipFile.close, exitpriority=10)
+
+
+def readMember(memberName, nested=True):
+    """
+    Decompresses one member in a worker process.
+    """
+    return expandMember(memberName, workerZipFile.read(memberName), nested)
+
+
+def iterMemberContents(zipFolder, parallel=False, workers=None, queueSize=None, nested=True):
+    """
+    Lazily yields (memberName, bytes) for every file of the zip file, without unzipping to disk.
+
+    zipFolder : input zip file containing soramame data
+    parallel  : decompress the members in a pool of worker processes
+    workers   : number of worker processes (default = number of CPUs)
+    queueSize : maximum number of members decompressed ahead of the consumer (default = 2 x workers),
+                bounds the memory held by the decompressed members
+    nested    : expand members that are zip files themselves
+    """
+    with zipfile.ZipFile(zipFolder, 'r') as zipFile:
+        memberNames = [member.filename for member in zipFile.infolist() if not member.is_dir()]
+        if not parallel:
+            for memberName in memberNames:
+                yield from expandMember(memberName, zipFile.read(memberName), nested)
+            return
+
+    workers = workers or os.cpu_count()
+    queueSize = queueSize or 2 * workers
+    with ProcessPoolExecutor(workers, initializer=initializeWorker, initargs=(zipFolder,)) as pool:
+        pending = deque()
+        for memberName in memberNames:
+            pending.append(pool.submit(readMember, memberName, nested))
+            # the members are yielded in order, at most queueSize members are in flight
+            if len(pending) >= queueSize:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iterMembers(zipFolder, parallel=False, workers=None, queueSize=None, nested=True, encoding='cp932'):
+    """
+    Lazily yields (memberName, decoded text stream) for every file of the zip file, see iterMemberContents.
+    """
+    for memberName, content in iterMemberContents(zipFolder, parallel, workers, queueSize, nested):
+        yield memberName, io.TextIOWrapper(io.BytesIO(content), encoding=encoding, newline='')
+
+
 if __name__ == '__main__':
     if len(sys.argv) < 3:
         print("Error : Incorrect number of input parameters given : " + str(len(sys.argv) - 1))